@@ -0,0 +1,407 @@
+import argparse
+import asyncio
+import hashlib
+import json
+import os
+import platform
+import random
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+import libipld
+import requests
+
+import fake_server
+import main
+
+BENCH_DID = 'did:plc:benchbot'
+BENCH_HANDLE = 'benchbot.bsky.social'
+BENCH_TERMS = ['python', 'rustlang', 'opensource', 'machinelearning', 'typescript']
+FILLER_WORDS = ['the', 'morning', 'coffee', 'weekend', 'photo', 'music', 'today', 'finally', 'great', 'news']
+
+
+def write_jetstream_replay(path, events, match_ratio=0.01, seed=0):
+    # Synthetic Jetstream lines: mostly posts, some likes and follows, a small share matching the bench terms
+    rng = random.Random(seed)
+    with open(path, 'w', encoding='utf-8') as f:
+        for index in range(events):
+            did = f'did:plc:{rng.getrandbits(64):016x}'
+            roll = rng.random()
+            if roll < 0.2:
+                collection, record = 'app.bsky.feed.like', {'$type': 'app.bsky.feed.like',
+                                                            'subject': {'uri': f'at://{did}/app.bsky.feed.post/x'}}
+            elif roll < 0.25:
+                collection, record = 'app.bsky.graph.follow', {'$type': 'app.bsky.graph.follow', 'subject': did}
+            else:
+                words = rng.choices(FILLER_WORDS, k=rng.randint(5, 30))
+                if rng.random() < match_ratio:
+                    words.insert(rng.randrange(len(words)), f'#{rng.choice(BENCH_TERMS)}')
+                if rng.random() < match_ratio / 4:
+                    words.append(f'@{BENCH_HANDLE}')
+                collection, record = 'app.bsky.feed.post', {'$type': 'app.bsky.feed.post', 'langs': ['en'],
+                                                            'text': ' '.join(words), 'createdAt': '2026-01-01T00:00:00Z'}
+            event = {'did': did, 'time_us': 1_700_000_000_000_000 + index, 'kind': 'commit',
+                     'commit': {'rev': 'r', 'operation': 'create', 'collection': collection,
+                                'rkey': f'{index:013d}', 'record': record, 'cid': 'bafyrei'}}
+            f.write(json.dumps(event, ensure_ascii=False, separators=(',', ':')) + '\n')
+
+
+def _varint(value):
+    out = bytearray()
+    while value > 0x7f:
+        out.append(value & 0x7f | 0x80)
+        value >>= 7
+    out.append(value)
+    return bytes(out)
+
+
+def _cid(block):
+    # CIDv1, dag-cbor, sha2-256
+    return b'\x01\x71\x12\x20' + hashlib.sha256(block).digest()
+
+
+def write_firehose_replay(path, frames, match_ratio=0.01, seed=0):
+    # Synthetic length-prefixed #commit frames: one op each, a record block, a commit block and a few MST nodes
+    rng = random.Random(seed)
+    with open(path, 'wb') as f:
+        for index in range(frames):
+            did = f'did:plc:{rng.getrandbits(64):016x}'
+            roll = rng.random()
+            if roll < 0.5:
+                collection, record = 'app.bsky.feed.like', {'$type': 'app.bsky.feed.like', 'createdAt': '2026-01-01T00:00:00Z',
+                                                            'subject': {'uri': f'at://{did}/app.bsky.feed.post/x', 'cid': 'bafyrei'}}
+            elif roll < 0.6:
+                subject = BENCH_DID if rng.random() < match_ratio else f'did:plc:{rng.getrandbits(64):016x}'
+                collection, record = 'app.bsky.graph.follow', {'$type': 'app.bsky.graph.follow',
+                                                               'createdAt': '2026-01-01T00:00:00Z', 'subject': subject}
+            elif roll < 0.7:
+                collection, record = 'app.bsky.feed.repost', {'$type': 'app.bsky.feed.repost', 'createdAt': '2026-01-01T00:00:00Z',
+                                                              'subject': {'uri': f'at://{did}/app.bsky.feed.post/x', 'cid': 'bafyrei'}}
+            else:
+                words = rng.choices(FILLER_WORDS, k=rng.randint(5, 30))
+                if rng.random() < match_ratio:
+                    words.insert(rng.randrange(len(words)), f'#{rng.choice(BENCH_TERMS)}')
+                collection, record = 'app.bsky.feed.post', {'$type': 'app.bsky.feed.post', 'langs': ['en'],
+                                                            'text': ' '.join(words), 'createdAt': '2026-01-01T00:00:00Z'}
+            record_block = libipld.encode_dag_cbor(record)
+            record_cid = _cid(record_block)
+            blocks = [(record_cid, record_block)]
+            for depth in range(4):
+                node = libipld.encode_dag_cbor({'e': [{'k': rng.randbytes(24), 'p': depth, 't': None, 'v': record_cid}
+                                                      for _ in range(6)], 'l': None})
+                blocks.append((_cid(node), node))
+            commit = libipld.encode_dag_cbor({'did': did, 'rev': '3kbench', 'sig': rng.randbytes(64),
+                                              'data': blocks[1][0], 'prev': None, 'version': 3})
+            commit_cid = _cid(commit)
+            blocks.insert(0, (commit_cid, commit))
+            header = libipld.encode_dag_cbor({'roots': [commit_cid], 'version': 1})
+            car = _varint(len(header)) + header + b''.join(_varint(len(cid) + len(block)) + cid + block
+                                                           for cid, block in blocks)
+            body = {'ops': [{'action': 'create', 'path': f'{collection}/{index:013d}', 'cid': record_cid}],
+                    'rev': '3kbench', 'seq': index, 'prev': None, 'repo': did, 'time': '2026-01-01T00:00:00Z',
+                    'blobs': [], 'since': None, 'blocks': car, 'commit': commit_cid, 'rebase': False, 'tooBig': False}
+            frame = libipld.encode_dag_cbor({'op': 1, 't': '#commit'}) + libipld.encode_dag_cbor(body)
+            f.write(len(frame).to_bytes(4, 'big') + frame)
+
+
+async def _drain(queue):
+    while True:
+        await queue.get()
+
+
+async def _replay(consumer, subscription, path):
+    drain = asyncio.create_task(_drain(subscription.queue))
+    start = time.perf_counter()
+    await consumer.replay(path)
+    elapsed = time.perf_counter() - start
+    drain.cancel()
+    return elapsed
+
+
+def _naive_replay(subscription, path):
+    # Baseline: decode every line and classify every post
+    start = time.perf_counter()
+    matched = 0
+    with open(path, 'rb') as f:
+        for line in f:
+            event = json.loads(line)
+            commit = event.get('commit') or {}
+            if commit.get('collection') == 'app.bsky.feed.post' and commit.get('operation') == 'create':
+                record = commit.get('record') or {}
+                if subscription.classify(event['did'], record.get('text', ''), record):
+                    matched += 1
+    return time.perf_counter() - start, matched
+
+
+def _read_frames(path):
+    frames = []
+    with open(path, 'rb') as f:
+        while prefix := f.read(4):
+            frames.append(f.read(int.from_bytes(prefix, 'big')))
+    return frames
+
+
+def _full_decode_replay(subscription, path):
+    # Baseline: decode every frame and every CAR block, as the SDK's firehose client does
+    frames = _read_frames(path)
+    start = time.perf_counter()
+    matched = 0
+    for frame in frames:
+        header, body = libipld.decode_dag_cbor_multi(frame)
+        if header.get('t') != '#commit':
+            continue
+        _, blocks = libipld.decode_car(body['blocks'])
+        for op in body['ops']:
+            collection = op['path'].split('/')[0]
+            if op['action'] != 'create' or collection not in main.FIREHOSE_COLLECTIONS:
+                continue
+            record = blocks[op['cid']]
+            if collection == 'app.bsky.graph.follow':
+                matched += record.get('subject') == subscription.did
+            elif subscription.classify(body['repo'], record.get('text', ''), record):
+                matched += 1
+    return time.perf_counter() - start, matched, len(frames)
+
+
+def bench_firehose(path=None, frames=50_000):
+    with tempfile.TemporaryDirectory() as tmp:
+        if path is None:
+            path = os.path.join(tmp, 'firehose.frames')
+            write_firehose_replay(path, frames)
+        consumer = main.FirehoseConsumer()
+        subscription = consumer.subscribe(BENCH_DID, BENCH_HANDLE, BENCH_TERMS)
+        elapsed = asyncio.run(_replay(consumer, subscription, path))
+        baseline_elapsed, baseline_matched, _ = _full_decode_replay(subscription, path)
+    return {
+        'frames': consumer.events,
+        'matched': consumer.matched,
+        'frames_per_sec': consumer.events / elapsed,
+        'baseline_matched': baseline_matched,
+        'baseline_frames_per_sec': consumer.events / baseline_elapsed,
+    }
+
+
+def bench_jetstream(path=None, events=200_000):
+    with tempfile.TemporaryDirectory() as tmp:
+        if path is None:
+            path = os.path.join(tmp, 'jetstream.jsonl')
+            write_jetstream_replay(path, events)
+        consumer = main.JetstreamConsumer()
+        subscription = consumer.subscribe(BENCH_DID, BENCH_HANDLE, BENCH_TERMS)
+        elapsed = asyncio.run(_replay(consumer, subscription, path))
+        baseline_elapsed, baseline_matched = _naive_replay(subscription, path)
+    return {
+        'events': consumer.events,
+        'matched': consumer.matched,
+        'events_per_sec': consumer.events / elapsed,
+        'baseline_matched': baseline_matched,
+        'baseline_events_per_sec': consumer.events / baseline_elapsed,
+    }
+
+
+def _fake_bot(tmp, **server_options):
+    # A bot logged into a fresh in-process fake PDS; the caller stops the server
+    server = fake_server.FakeServer(**server_options).start()
+    main.PDS_URL = server.url
+    bot = main.BlueskyBot(fake_server.FAKE_HANDLE, 'bench', db_path=os.path.join(tmp, 'bench.db'))
+    return server, bot
+
+
+def _latency_summary(samples):
+    cuts = statistics.quantiles(samples, n=100)
+    return {'mean_ms': statistics.fmean(samples) * 1e3, 'p50_ms': cuts[49] * 1e3, 'p95_ms': cuts[94] * 1e3}
+
+
+def bench_criteria(pages=50):
+    # Suggestion pages as the SDK returns them, filtered the batched way and one user at a time
+    with tempfile.TemporaryDirectory() as tmp:
+        server, bot = _fake_bot(tmp)
+        try:
+            suggestion_pages = []
+            cursor = None
+            for _ in range(pages):
+                actors, cursor = bot.get_suggestions(cursor)
+                suggestion_pages.append(actors)
+            users = sum(len(page) for page in suggestion_pages)
+
+            start = time.perf_counter()
+            matched = sum(len(bot.filter_candidates(page)) for page in suggestion_pages)
+            elapsed = time.perf_counter() - start
+
+            start = time.perf_counter()
+            single_matched = sum(bot.check_criteria(user) for page in suggestion_pages for user in page)
+            single_elapsed = time.perf_counter() - start
+        finally:
+            bot.close()
+            server.stop()
+    return {
+        'users': users,
+        'matched': matched,
+        'users_per_sec': users / elapsed,
+        'single_matched': single_matched,
+        'single_users_per_sec': users / single_elapsed,
+    }
+
+
+def bench_db_writes(rows=5000):
+    # Follow records committed one by one, as before the write queue, versus queued and flushed in batches
+    results = {'rows': rows}
+    with tempfile.TemporaryDirectory() as tmp:
+        for name, per_row_commit in (('per_commit', True), ('batched', False)):
+            store = main.FollowStore(os.path.join(tmp, f'{name}.db'))
+            start = time.perf_counter()
+            for index in range(rows):
+                store.record_follow(f'did:plc:{name}{index:012d}', f'user{index}.bsky.social', datetime.now(),
+                                    f'at://did:plc:bench/app.bsky.graph.follow/{index}')
+                if per_row_commit:
+                    store.flush()
+            store.flush()
+            elapsed = time.perf_counter() - start
+            store.close()
+            results[f'{name}_rows_per_sec'] = rows / elapsed
+            results[f'{name}_us_per_row'] = elapsed / rows * 1e6
+    return results
+
+
+def bench_llm(calls=200, latency=0.0):
+    # get_assistant_response through the pooled client, against a token fetch and a completion on fresh connections
+    with fake_server.FakeServer(llm_latency=latency) as server:
+        client = main.LLMClient(base_url=server.url)
+        pooled = []
+        for _ in range(calls):
+            start = time.perf_counter()
+            main.get_assistant_response('system', 'Create a post.', client=client)
+            pooled.append(time.perf_counter() - start)
+        client.close()
+
+        fresh = []
+        for _ in range(calls):
+            start = time.perf_counter()
+            token = requests.get(f'{server.url}/v1/get-token', timeout=main.LLM_TIMEOUT).json()['token']
+            requests.post(f'{server.url}/v1/chat/completions', timeout=main.LLM_TIMEOUT,
+                          json={'token': token, 'model': main.LLM_MODEL, 'stream': False,
+                                'message': [{'role': 'user', 'content': 'Create a post.'}]}).json()
+            fresh.append(time.perf_counter() - start)
+    return {
+        'calls': calls,
+        'reused': _latency_summary(pooled),
+        'fresh_connections': _latency_summary(fresh),
+    }
+
+
+async def _follow_for(bot, duration):
+    follows = failures = 0
+    deadline = time.perf_counter() + duration
+    while time.perf_counter() < deadline:
+        user = await bot.next_candidate()
+        if user is None:
+            break
+        try:
+            if await bot.call(bot.follow_user, user):
+                follows += 1
+            else:
+                failures += 1
+        except Exception:
+            failures += 1
+    return follows, failures
+
+
+def bench_follows(duration=10.0, rate_limit=20, rate_window=2, latency=0.005):
+    # Discovery, filtering and follows back to back, with pacing off and the fake PDS enforcing a fixed limit
+    with tempfile.TemporaryDirectory() as tmp:
+        server, bot = _fake_bot(tmp, latency=latency, rate_limit=rate_limit, rate_window=rate_window)
+        try:
+            start = time.perf_counter()
+            follows, failures = asyncio.run(_follow_for(bot, duration))
+            elapsed = time.perf_counter() - start
+            bot.db.flush()
+            stats = dict(server.backend.stats)
+        finally:
+            bot.close()
+            server.stop()
+    return {
+        'follows': follows,
+        'failures': failures,
+        'seconds': elapsed,
+        'follows_per_hour': follows / elapsed * 3600,
+        'limit_per_hour': rate_limit / rate_window * 3600,
+        'server_requests': stats.get('requests', 0),
+        'server_429s': stats.get('429', 0),
+    }
+
+
+def _git_revision():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+                              cwd=os.path.dirname(os.path.abspath(__file__)), check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+BENCHMARKS = ('criteria', 'db', 'llm', 'follows', 'jetstream', 'firehose')
+
+
+def main_cli():
+    parser = argparse.ArgumentParser(description='Benchmark bot hot paths against local data and fake services')
+    parser.add_argument('--bench', action='append', choices=BENCHMARKS,
+                        help='Benchmark to run, repeatable; all of them when omitted')
+    parser.add_argument('--output', default='benchmark_results.json', help='JSON file the results are written to')
+    parser.add_argument('--pages', type=int, default=50, help='Suggestion pages for the criteria benchmark')
+    parser.add_argument('--rows', type=int, default=5000, help='Follow rows for the DB benchmark')
+    parser.add_argument('--calls', type=int, default=200, help='Calls for the LLM benchmark')
+    parser.add_argument('--duration', type=float, default=10.0, help='Seconds to run the follow benchmark')
+    parser.add_argument('--jetstream-replay', help='Jetstream JSON lines file, generated when omitted')
+    parser.add_argument('--events', type=int, default=200_000, help='Events to generate for the replay')
+    parser.add_argument('--firehose-replay', help='Length-prefixed firehose frame file, generated when omitted')
+    parser.add_argument('--frames', type=int, default=50_000, help='Frames to generate for the replay')
+    args = parser.parse_args()
+    selected = args.bench or BENCHMARKS
+
+    results = {}
+    if 'criteria' in selected:
+        result = results['criteria'] = bench_criteria(args.pages)
+        print(f"criteria: {result['users_per_sec']:,.0f} users/s batched "
+              f"({result['single_users_per_sec']:,.0f} users/s one at a time), "
+              f"{result['matched']} matched of {result['users']}")
+    if 'db' in selected:
+        result = results['db'] = bench_db_writes(args.rows)
+        print(f"db: {result['batched_us_per_row']:,.1f} us/follow batched "
+              f"({result['per_commit_us_per_row']:,.1f} us/follow committed one by one)")
+    if 'llm' in selected:
+        result = results['llm'] = bench_llm(args.calls)
+        print(f"llm: p50 {result['reused']['p50_ms']:.2f} ms, p95 {result['reused']['p95_ms']:.2f} ms reusing connections "
+              f"(p50 {result['fresh_connections']['p50_ms']:.2f} ms, "
+              f"p95 {result['fresh_connections']['p95_ms']:.2f} ms on fresh ones)")
+    if 'follows' in selected:
+        result = results['follows'] = bench_follows(args.duration)
+        print(f"follows: {result['follows_per_hour']:,.0f} follows/hour under a {result['limit_per_hour']:,.0f}/hour limit, "
+              f"{result['follows']} follows, {result['failures']} failures, {result['server_429s']} server 429s")
+    if 'jetstream' in selected:
+        result = results['jetstream'] = bench_jetstream(args.jetstream_replay, args.events)
+        print(f"jetstream: {result['events_per_sec']:,.0f} events/s "
+              f"(naive decode {result['baseline_events_per_sec']:,.0f} events/s), "
+              f"{result['matched']} matched of {result['events']}")
+    if 'firehose' in selected:
+        result = results['firehose'] = bench_firehose(args.firehose_replay, args.frames)
+        print(f"firehose: {result['frames_per_sec']:,.0f} frames/s "
+              f"(full decode {result['baseline_frames_per_sec']:,.0f} frames/s), "
+              f"{result['matched']} matched of {result['frames']}")
+
+    # Revision and interpreter go with the numbers, so files from different versions can be compared
+    report = {
+        'revision': _git_revision(),
+        'timestamp': datetime.now().isoformat(timespec='seconds'),
+        'python': sys.version.split()[0],
+        'platform': platform.platform(),
+        'results': results,
+    }
+    with open(args.output, 'w', encoding='utf-8') as f:
+        json.dump(report, f, indent=2)
+    print(f"Results written to {args.output}")
+
+if __name__ == '__main__':
+    main_cli()
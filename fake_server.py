@@ -0,0 +1,392 @@
+import argparse
+import base64
+import hashlib
+import itertools
+import json
+import random
+import socket
+import threading
+import time
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+FAKE_DID = 'did:plc:fakebotaccount000'
+FAKE_HANDLE = 'fakebot.bsky.social'
+FAKE_SESSION_TTL = 7200
+FAKE_LIST_SIZE = 10_000
+FAKE_WORDS = ['python', 'coffee', 'opensource', 'music', 'photography', 'rustlang', 'travel', 'books',
+              'design', 'running', 'science', 'gaming', 'art', 'machinelearning', 'cooking', 'bsky']
+FAKE_DOMAINS = ['bsky.social', 'bsky.social', 'example.com', 'skyfans.net']
+
+
+def fake_jwt(did, scope, ttl, now):
+    # Unsigned, the SDK only reads the payload for expiry checks
+    now = int(now)
+    header = base64.urlsafe_b64encode(b'{"alg":"ES256K","typ":"JWT"}').rstrip(b'=')
+    payload = base64.urlsafe_b64encode(json.dumps(
+        {'scope': scope, 'sub': did, 'iat': now, 'exp': now + ttl, 'aud': 'did:web:fake.pds'}).encode()).rstrip(b'=')
+    return f"{header.decode()}.{payload.decode()}.{base64.urlsafe_b64encode(b'fake').rstrip(b'=').decode()}"
+
+
+def fake_cid(data):
+    return 'bafyrei' + base64.b32encode(hashlib.sha256(data.encode()).digest()).decode().lower().rstrip('=')[:52]
+
+
+class FakeBackend:
+    # Responses are a pure function of (seed, endpoint, request count for that endpoint, request data),
+    # so the same run against the same seed sees the same latencies, errors and data
+    def __init__(self, seed=0, latency=0.0, jitter=0.0, error_rate=0.0, rate_limit_rate=0.0,
+                 rate_limit=3000, rate_window=300, llm_latency=0.0, llm_jitter=0.0, llm_error_rate=0.0,
+                 follow_back_rate=0.2, mention_rate=0.0, clock=time):
+        # Anything with time() and sleep(): the time module, or main.SimulatedClock for simulated runs
+        self.clock = clock
+        self.seed = seed
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.rate_limit_rate = rate_limit_rate
+        self.rate_limit = rate_limit
+        self.rate_window = rate_window
+        self.llm_latency = llm_latency
+        self.llm_jitter = llm_jitter
+        self.llm_error_rate = llm_error_rate
+        self.follow_back_rate = follow_back_rate
+        self.mention_rate = mention_rate
+        self.started_at = clock.time()
+        self.counts = Counter()
+        self.stats = Counter()
+        self.windows = {}
+        self.records = {}
+        self.follows = {}
+        self.rkeys = itertools.count(1)
+        self._lock = threading.Lock()
+        self.routes = {
+            'com.atproto.server.createSession': self.create_session,
+            'com.atproto.server.refreshSession': self.create_session,
+            'com.atproto.server.getSession': self.get_session,
+            'com.atproto.identity.resolveHandle': self.resolve_handle,
+            'com.atproto.repo.createRecord': self.create_record,
+            'com.atproto.repo.deleteRecord': self.delete_record,
+            'com.atproto.repo.applyWrites': self.apply_writes,
+            'app.bsky.actor.getProfile': self.get_profile,
+            'app.bsky.actor.getProfiles': self.get_profiles,
+            'app.bsky.actor.getSuggestions': self.get_suggestions,
+            'app.bsky.actor.searchActors': self.search_actors,
+            'app.bsky.graph.getFollowers': self.get_followers,
+            'app.bsky.feed.getLikes': self.get_likes,
+            'app.bsky.notification.listNotifications': self.list_notifications,
+        }
+
+    def bump(self, key):
+        with self._lock:
+            self.stats[key] += 1
+
+    def rng(self, endpoint):
+        with self._lock:
+            count = self.counts[endpoint]
+            self.counts[endpoint] += 1
+        return random.Random(f'{self.seed}:{endpoint}:{count}')
+
+    def actor_index(self, actor):
+        if actor.startswith('did:plc:fake'):
+            return int(actor[len('did:plc:fake'):], 16)
+        if actor.startswith('user'):
+            return int(actor[4:].split('.', 1)[0])
+        return None
+
+    def actor(self, index):
+        rng = random.Random(f'{self.seed}:actor:{index}')
+        did = f'did:plc:fake{index:016x}'
+        return {
+            'did': did,
+            'handle': f'user{index}.{rng.choice(FAKE_DOMAINS)}',
+            'displayName': f'User {index}',
+            'description': ' '.join(rng.sample(FAKE_WORDS, 3)),
+            'followersCount': int(rng.paretovariate(1.2) * 50),
+            'followsCount': rng.randint(0, 2000),
+            'postsCount': rng.randint(0, 5000),
+            'viewer': {'following': self.follows[did]} if did in self.follows else {},
+        }
+
+    def self_profile(self):
+        return {'did': FAKE_DID, 'handle': FAKE_HANDLE, 'displayName': 'Fake bot',
+                'followersCount': len(self.followers()), 'followsCount': len(self.follows), 'postsCount': 0}
+
+    def page(self, offset_key, cursor, limit, total=FAKE_LIST_SIZE):
+        # Every list is a deterministic window of actor indexes; the cursor is just the next offset
+        offset = int(cursor) if cursor else 0
+        limit = min(int(limit or 50), 100)
+        end = min(offset + limit, total)
+        base = int(hashlib.sha256(offset_key.encode()).hexdigest()[:8], 16)
+        actors = [self.actor((base + index) % (1 << 40)) for index in range(offset, end)]
+        return actors, (str(end) if end < total else None)
+
+    def followers(self):
+        # Followed accounts follow back with follow_back_rate, decided once per account
+        return [did for did in self.follows
+                if random.Random(f'{self.seed}:followback:{did}').random() < self.follow_back_rate]
+
+    def create_session(self, params, body):
+        return {'did': FAKE_DID, 'handle': FAKE_HANDLE, 'active': True,
+                'accessJwt': fake_jwt(FAKE_DID, 'com.atproto.access', FAKE_SESSION_TTL, self.clock.time()),
+                'refreshJwt': fake_jwt(FAKE_DID, 'com.atproto.refresh', FAKE_SESSION_TTL * 12, self.clock.time())}
+
+    def get_session(self, params, body):
+        return {'did': FAKE_DID, 'handle': FAKE_HANDLE, 'active': True}
+
+    def resolve_handle(self, params, body):
+        handle = params['handle'][0]
+        index = self.actor_index(handle)
+        if handle == FAKE_HANDLE:
+            return {'did': FAKE_DID}
+        if index is None:
+            return 400, {'error': 'InvalidRequest', 'message': 'Unable to resolve handle'}
+        return {'did': f'did:plc:fake{index:016x}'}
+
+    def create_record(self, params, body):
+        rkey = body.get('rkey') or f'3fake{next(self.rkeys):09d}'
+        uri = f"at://{body['repo']}/{body['collection']}/{rkey}"
+        with self._lock:
+            self.records[uri] = body['record']
+            if body['collection'] == 'app.bsky.graph.follow':
+                self.follows[body['record']['subject']] = uri
+        self.bump(body['collection'])
+        return {'uri': uri, 'cid': fake_cid(uri)}
+
+    def remove_record(self, repo, collection, rkey):
+        uri = f'at://{repo}/{collection}/{rkey}'
+        with self._lock:
+            record = self.records.pop(uri, None)
+            if record and collection == 'app.bsky.graph.follow':
+                self.follows.pop(record['subject'], None)
+        self.bump(f'{collection}#delete')
+
+    def delete_record(self, params, body):
+        self.remove_record(body['repo'], body['collection'], body['rkey'])
+        return {}
+
+    def apply_writes(self, params, body):
+        for write in body.get('writes', []):
+            if write.get('$type') == 'com.atproto.repo.applyWrites#delete':
+                self.remove_record(body['repo'], write['collection'], write['rkey'])
+        return {'results': []}
+
+    def get_profile(self, params, body):
+        actor = params['actor'][0]
+        if actor in (FAKE_DID, FAKE_HANDLE):
+            return self.self_profile()
+        index = self.actor_index(actor)
+        if index is None:
+            return 400, {'error': 'InvalidRequest', 'message': 'Profile not found'}
+        return self.actor(index)
+
+    def get_profiles(self, params, body):
+        indexes = [self.actor_index(actor) for actor in params.get('actors', [])]
+        return {'profiles': [self.actor(index) for index in indexes if index is not None]}
+
+    def get_suggestions(self, params, body):
+        actors, cursor = self.page('suggestions', params.get('cursor', [None])[0], params.get('limit', [50])[0])
+        return {'actors': actors, 'cursor': cursor}
+
+    def search_actors(self, params, body):
+        term = params.get('q', params.get('term', ['']))[0]
+        actors, cursor = self.page(f'search:{term}', params.get('cursor', [None])[0], params.get('limit', [25])[0], 1000)
+        return {'actors': actors, 'cursor': cursor}
+
+    def get_followers(self, params, body):
+        actor = params['actor'][0]
+        limit = min(int(params.get('limit', [50])[0]), 100)
+        if actor in (FAKE_DID, FAKE_HANDLE):
+            followers = self.followers()[::-1]
+            offset = int(params.get('cursor', [0])[0])
+            page = [self.actor(self.actor_index(did)) for did in followers[offset:offset + limit]]
+            cursor = str(offset + limit) if offset + limit < len(followers) else None
+            return {'subject': self.self_profile(), 'followers': page, 'cursor': cursor}
+        actors, cursor = self.page(f'followers:{actor}', params.get('cursor', [None])[0], limit, 500)
+        return {'subject': self.actor(self.actor_index(actor) or 0), 'followers': actors, 'cursor': cursor}
+
+    def get_likes(self, params, body):
+        uri = params['uri'][0]
+        actors, cursor = self.page(f'likes:{uri}', params.get('cursor', [None])[0], params.get('limit', [50])[0], 300)
+        now = time.strftime('%Y-%m-%dT%H:%M:%S.000Z', time.gmtime(self.clock.time()))
+        return {'uri': uri, 'likes': [{'actor': actor, 'createdAt': now, 'indexedAt': now} for actor in actors],
+                'cursor': cursor}
+
+    def mention(self, index):
+        rng = random.Random(f'{self.seed}:mention:{index}')
+        author = self.actor(rng.randrange(1 << 20))
+        indexed_at = time.strftime('%Y-%m-%dT%H:%M:%S', time.gmtime(self.started_at + index / self.mention_rate))
+        indexed_at += f'.{index % 1000:03d}Z'
+        uri = f"at://{author['did']}/app.bsky.feed.post/3mention{index:08d}"
+        text = f"@{FAKE_HANDLE} what do you think about {' and '.join(rng.sample(FAKE_WORDS, 2))}?"
+        return {'uri': uri, 'cid': fake_cid(uri), 'author': author, 'reason': 'mention', 'isRead': False,
+                'indexedAt': indexed_at, 'record': {'$type': 'app.bsky.feed.post', 'text': text, 'createdAt': indexed_at}}
+
+    def list_notifications(self, params, body):
+        # Mentions arrive at mention_rate per second since startup, newest first
+        available = int((self.clock.time() - self.started_at) * self.mention_rate) if self.mention_rate else 0
+        start = int(params.get('cursor', [available])[0])
+        limit = min(int(params.get('limit', [50])[0]), 100)
+        indexes = range(start - 1, max(start - 1 - limit, -1), -1)
+        cursor = str(indexes[-1]) if indexes and indexes[-1] > 0 else None
+        return {'notifications': [self.mention(index) for index in indexes], 'cursor': cursor}
+
+    def rate_limit_headers(self, endpoint):
+        # Fixed window per endpoint, the same shape of headers the real PDS sends
+        now = self.clock.time()
+        window_start = now - now % self.rate_window
+        with self._lock:
+            start, used = self.windows.get(endpoint, (window_start, 0))
+            if start != window_start:
+                used = 0
+            used += 1
+            self.windows[endpoint] = (window_start, used)
+        headers = {
+            'ratelimit-limit': str(self.rate_limit),
+            'ratelimit-remaining': str(max(self.rate_limit - used, 0)),
+            'ratelimit-reset': str(int(window_start + self.rate_window)),
+            'ratelimit-policy': f'{self.rate_limit};w={self.rate_window}',
+        }
+        return headers, used > self.rate_limit
+
+    def xrpc(self, method, nsid, params, body):
+        rng = self.rng(nsid)
+        self.clock.sleep(self.latency + rng.uniform(0, self.jitter))
+        self.bump('requests')
+        headers, exhausted = self.rate_limit_headers(nsid)
+        route = self.routes.get(nsid)
+        if route is None:
+            return 501, {'error': 'MethodNotImplemented', 'message': f'{nsid} is not implemented'}, headers
+        if exhausted or rng.random() < self.rate_limit_rate:
+            self.bump('429')
+            headers['ratelimit-remaining'] = '0'
+            return 429, {'error': 'RateLimitExceeded', 'message': 'Rate Limit Exceeded'}, headers
+        if rng.random() < self.error_rate:
+            self.bump('500')
+            return 500, {'error': 'InternalServerError', 'message': 'Injected failure'}, headers
+        result = route(params, body)
+        status, payload = result if isinstance(result, tuple) else (200, result)
+        return status, payload, headers
+
+    def llm(self, path, body):
+        rng = self.rng(path)
+        self.clock.sleep(self.llm_latency + rng.uniform(0, self.llm_jitter))
+        self.bump(path)
+        if rng.random() < self.llm_error_rate:
+            self.bump('llm_500')
+            return 500, {'error': 'Injected failure'}
+        if path == '/v1/get-token':
+            return 200, {'token': f'fake-token-{rng.getrandbits(32):08x}'}
+        prompt = body.get('message', [{}])[-1].get('content', '')
+        words = rng.sample(FAKE_WORDS, 3)
+        if 'wrote:' in prompt:
+            content = f"Great question! I'd start with {words[0]} and see where {words[1]} takes you."
+        else:
+            content = f"Small steps every day add up. Today: a little {words[0]}, some {words[1]}. #{words[2]}"
+        return 200, {'choice': [{'message': {'role': 'assistant', 'content': content}}]}
+
+
+class FakeRequestHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def setup(self):
+        super().setup()
+        # Small responses on keep-alive connections otherwise sit out Nagle's delay
+        self.connection.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+
+    def log_message(self, format, *args):
+        pass
+
+    def respond(self, status, payload, headers=None):
+        data = json.dumps(payload).encode()
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(data)))
+        for key, value in (headers or {}).items():
+            self.send_header(key, value)
+        self.end_headers()
+        self.wfile.write(data)
+
+    def handle_request(self, method):
+        url = urlparse(self.path)
+        length = int(self.headers.get('Content-Length') or 0)
+        body = json.loads(self.rfile.read(length) or b'{}') if length else {}
+        backend = self.server.backend
+        if url.path.startswith('/xrpc/'):
+            self.respond(*backend.xrpc(method, url.path[len('/xrpc/'):], parse_qs(url.query), body))
+        elif url.path in ('/v1/get-token', '/v1/chat/completions'):
+            self.respond(*backend.llm(url.path, body))
+        elif url.path == '/fake/stats':
+            self.respond(200, dict(backend.stats))
+        else:
+            self.respond(404, {'error': 'NotFound'})
+
+    def do_GET(self):
+        self.handle_request('GET')
+
+    def do_POST(self):
+        self.handle_request('POST')
+
+
+class FakeServer:
+    # Fake PDS (XRPC under /xrpc) and fake LLM API (/v1) on one local port
+    def __init__(self, host='127.0.0.1', port=0, **options):
+        self.backend = FakeBackend(**options)
+        self.httpd = ThreadingHTTPServer((host, port), FakeRequestHandler)
+        self.httpd.daemon_threads = True
+        self.httpd.backend = self.backend
+        self.thread = None
+
+    @property
+    def url(self):
+        host, port = self.httpd.server_address[:2]
+        return f'http://{host}:{port}'
+
+    def start(self):
+        self.thread = threading.Thread(target=self.httpd.serve_forever, daemon=True, name='fake-server')
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+
+def main_cli():
+    parser = argparse.ArgumentParser(description='Local fake PDS and LLM API for offline runs and benchmarks')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8787)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--latency', type=float, default=0.0, help='Base XRPC latency in seconds')
+    parser.add_argument('--jitter', type=float, default=0.0, help='Extra uniform XRPC latency in seconds')
+    parser.add_argument('--error-rate', type=float, default=0.0, help='Share of XRPC calls failing with 500')
+    parser.add_argument('--rate-limit-rate', type=float, default=0.0, help='Share of XRPC calls failing with 429')
+    parser.add_argument('--rate-limit', type=int, default=3000, help='Requests per endpoint per window')
+    parser.add_argument('--rate-window', type=int, default=300, help='Rate limit window in seconds')
+    parser.add_argument('--llm-latency', type=float, default=0.0)
+    parser.add_argument('--llm-jitter', type=float, default=0.0)
+    parser.add_argument('--llm-error-rate', type=float, default=0.0)
+    parser.add_argument('--follow-back-rate', type=float, default=0.2)
+    parser.add_argument('--mention-rate', type=float, default=0.0, help='New mentions per second')
+    args = vars(parser.parse_args())
+
+    server = FakeServer(args.pop('host'), args.pop('port'), **args)
+    print(f'Fake PDS and LLM listening on {server.url}, run the bot with '
+          f'BLUESKY_PDS_URL={server.url} LLM_BASE_URL={server.url}')
+    try:
+        server.httpd.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.httpd.server_close()
+
+
+if __name__ == '__main__':
+    main_cli()
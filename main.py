@@ -1,27 +1,114 @@
 import os
+import asyncio
+import base64
+import atexit
+import bisect
+import contextlib
+import contextvars
+import copy
+import functools
+import itertools
+import json
 import logging
+import logging.handlers
 import sqlite3
 import random
+import re
 import time
-import requests 
-import sys
+import unicodedata
+import httpx
+import requests
+from requests.adapters import HTTPAdapter
 from datetime import datetime, timedelta
-from atproto import Client, exceptions
+from atproto import AtUri, Client, Session, SessionEvent, exceptions, models
+from atproto_client.request import Request, RequestBase
 from tenacity import retry, stop_after_attempt, wait_exponential, wait_fixed
-from pytz import timezone
+from pytz import timezone, utc
 from typing import Optional
 from dotenv import load_dotenv
+import queue
 import threading
-from collections import deque
+from collections import OrderedDict, deque, namedtuple
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from websockets.asyncio.client import connect as websocket_connect
 
 load_dotenv()
 
-logging.basicConfig(
-    filename='bluesky_bot.log',
-    filemode='a',
-    format='%(asctime)s - %(levelname)s - %(funcName)s - %(lineno)d - %(levelname)s - %(message)s',
-    level=logging.INFO
-)
+# Log records are queued by the caller and written by one listener thread, so file I/O stays off
+# the event loop and the worker threads. BLUESKY_LOG_FORMAT=text keeps the old plain-text lines.
+LOG_FILE = os.getenv('BLUESKY_LOG_FILE', 'bluesky_bot.log')
+LOG_LEVEL = os.getenv('BLUESKY_LOG_LEVEL', 'INFO').upper()
+LOG_FORMAT = os.getenv('BLUESKY_LOG_FORMAT', 'json')
+LOG_TEXT_FORMAT = '%(asctime)s - %(levelname)s - %(account)s - %(funcName)s - %(lineno)d - %(message)s'
+# Rotate by size by default; BLUESKY_LOG_ROTATE_WHEN (e.g. "midnight", "H") switches to time-based rotation
+LOG_MAX_BYTES = int(os.getenv('BLUESKY_LOG_MAX_BYTES', str(10 * 1024 * 1024)))
+LOG_ROTATE_WHEN = os.getenv('BLUESKY_LOG_ROTATE_WHEN')
+LOG_BACKUP_COUNT = int(os.getenv('BLUESKY_LOG_BACKUP_COUNT', '5'))
+
+# Handle of the account whose task or worker call is logging, stamped onto every record
+log_account = contextvars.ContextVar('log_account', default=None)
+
+
+class JsonLogFormatter(logging.Formatter):
+    def format(self, record):
+        entry = {
+            'time': datetime.fromtimestamp(record.created, utc).isoformat(timespec='milliseconds'),
+            'level': record.levelname,
+            'logger': record.name,
+            'function': record.funcName,
+            'line': record.lineno,
+            'thread': record.threadName,
+            'message': record.getMessage(),
+        }
+        account = getattr(record, 'account', '-')
+        if account != '-':
+            entry['account'] = account
+        if record.exc_info and not record.exc_text:
+            record.exc_text = self.formatException(record.exc_info)
+        if record.exc_text:
+            entry['exception'] = record.exc_text
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
+
+class LogQueueHandler(logging.handlers.QueueHandler):
+    def prepare(self, record):
+        # Resolve everything that depends on the calling thread before the record crosses the queue,
+        # but leave the final layout to the listener's formatter
+        record = copy.copy(record)
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        record.account = log_account.get() or '-'
+        return record
+
+
+def configure_logging(path=LOG_FILE, level=LOG_LEVEL, fmt=LOG_FORMAT):
+    if LOG_ROTATE_WHEN:
+        file_handler = logging.handlers.TimedRotatingFileHandler(path, when=LOG_ROTATE_WHEN,
+                                                                 backupCount=LOG_BACKUP_COUNT, encoding='utf-8')
+    else:
+        file_handler = logging.handlers.RotatingFileHandler(path, maxBytes=LOG_MAX_BYTES,
+                                                            backupCount=LOG_BACKUP_COUNT, encoding='utf-8')
+    file_handler.setFormatter(JsonLogFormatter() if fmt == 'json' else logging.Formatter(LOG_TEXT_FORMAT))
+
+    records = queue.SimpleQueue()
+    listener = logging.handlers.QueueListener(records, file_handler)
+    listener.start()
+    # Drain whatever is still queued on exit
+    atexit.register(listener.stop)
+
+    root = logging.getLogger()
+    for handler in root.handlers[:]:
+        root.removeHandler(handler)
+    root.addHandler(LogQueueHandler(records))
+    root.setLevel(level)
+    return listener
+
+
+log_listener = configure_logging()
 
 SYSTEM_PROMPT = """
 You are a highly skilled social media content creator specializing in Twitter (X). Your task is to generate engaging, high-quality, and concise tweets under 300 characters, strictly following these rules:
@@ -68,116 +155,1653 @@ Keep it simple and impactful, suitable for a general audience unless specified o
 
 Maintain a natural and conversational tone.
 """
+
+REPLY_SYSTEM_PROMPT = """
+You are replying to someone who mentioned you on Bluesky. Write one short, friendly and helpful reply under 300 characters that responds directly to what they said.
+
+No prefixes, no quotation marks around the reply and no explanations, only the reply itself. Do not start with their handle.
+"""
 DAILY_FOLLOW_LIMIT = 20
-FOLLOW_DELAY_MIN = 60 
-FOLLOW_DELAY_MAX = 4320
+FOLLOW_DELAY_MIN = 60
+# Follows are spread across these hours in POST_TIMEZONE, the planned gap varies by +/- FOLLOW_PACING_JITTER
+FOLLOW_ACTIVE_HOURS = ('08:00', '23:00')
+FOLLOW_PACING_JITTER = 0.3
 UNFOLLOW_AFTER_DAYS = 5
+UNFOLLOW_CHECK_INTERVAL = 3600
+UNFOLLOW_BATCH_SIZE = 50
+FOLLOWER_SYNC_INTERVAL = 1800
+FOLLOWER_FULL_SYNC_INTERVAL = 86400
+# Candidates seen through stronger signals rank higher in the follow queue
+CANDIDATE_SOURCE_WEIGHTS = {'likers': 3.0, 'stream': 2.5, 'followers_of_followers': 2.0, 'search': 1.5, 'suggestions': 1.0}
+CANDIDATE_PAGE_SIZE = 100
+CANDIDATE_BATCH_SIZE = 20
+CANDIDATE_QUEUE_TARGET = 200
+CANDIDATE_LIKED_POSTS = 5
+CANDIDATE_DISCOVERY_INTERVAL = 900
 REQUIRED_TERMS = ['bsky', 'sky']
+# Follow rules. An account's "criteria" entry in the accounts file overrides them key by key, keys it
+# leaves out keep these defaults. Fields can be handle, displayName and description; a user needs an
+# include hit (if any are set) and no exclude hit.
+# Follower/post count limits are checked against profiles fetched through the profile cache.
+FOLLOW_CRITERIA = {
+    'include': REQUIRED_TERMS,
+    'exclude': [],
+    'include_patterns': [],
+    'exclude_patterns': [],
+    'fields': ['handle'],
+    'min_followers': None,
+    'max_followers': None,
+    'min_posts': None,
+}
+PROFILE_CACHE_TTL = 86400
+PROFILE_CACHE_SIZE = 10000
+PROFILE_BATCH_SIZE = 25
 POST_TIMEZONE = timezone('Asia/Kolkata')
+# Daily posting windows in POST_TIMEZONE, one post lands at a random time inside each window
+POST_WINDOWS = [('09:00', '10:30'), ('13:00', '14:00'), ('19:00', '21:00')]
+POST_CALENDAR_DAYS = 14
+POST_MISSED_GRACE = 3600
+POST_DRAFT_BUFFER = 5
+POST_DRAFT_CHECK_INTERVAL = 1800
+POST_DRAFT_MAX_ATTEMPTS = 3
+POST_DRAFT_MAX_LENGTH = 3000
+POST_MAX_GRAPHEMES = 300
+# LLM replies to mentions, off unless BLUESKY_AUTO_REPLY=1
+REPLY_ENABLED = os.getenv('BLUESKY_AUTO_REPLY') == '1'
+REPLY_POLL_INTERVAL = 60
+REPLY_PAGE_SIZE = 50
+# Reply workers per account; LLM calls from every account share LLMClient's LLM_POOL_SIZE threads
+REPLY_CONCURRENCY = 8
+REPLY_QUEUE_SIZE = 200
+DB_PATH = 'bluesky_follows.db'
+DB_FLUSH_INTERVAL = 5
+DB_MAX_BATCH = 100
+SESSION_REFRESH_INTERVAL = 300
+SESSION_REFRESH_MARGIN = 1200
+RATE_LIMIT_DEFAULT = 3000
+RATE_LIMIT_DEFAULT_WINDOW = 300
+# Real-time candidates and mentions from Jetstream, off unless BLUESKY_JETSTREAM=1
+JETSTREAM_ENABLED = os.getenv('BLUESKY_JETSTREAM') == '1'
+JETSTREAM_URL = os.getenv('BLUESKY_JETSTREAM_URL', 'wss://jetstream2.us-east.bsky.network/subscribe')
+JETSTREAM_QUEUE_SIZE = 1000
+JETSTREAM_BATCH_SIZE = 25
+JETSTREAM_REWIND_US = 5_000_000
+JETSTREAM_RECONNECT_DELAY = 5
+# Raw repo commit frames instead of Jetstream JSON, used when BLUESKY_FIREHOSE=1
+FIREHOSE_ENABLED = os.getenv('BLUESKY_FIREHOSE') == '1'
+FIREHOSE_URL = os.getenv('BLUESKY_FIREHOSE_URL', 'wss://bsky.network/xrpc/com.atproto.sync.subscribeRepos')
+FIREHOSE_COLLECTIONS = ('app.bsky.feed.post', 'app.bsky.graph.follow')
+# Roughly the same few seconds of events as JETSTREAM_REWIND_US
+FIREHOSE_REWIND_SEQ = 10_000
+ACCOUNTS_FILE = os.getenv('BLUESKY_ACCOUNTS_FILE', 'accounts.json')
+# Prometheus text endpoint at /metrics, only served when BLUESKY_METRICS_PORT is set
+METRICS_PORT = int(os.getenv('BLUESKY_METRICS_PORT') or 0) or None
+METRICS_HOST = os.getenv('BLUESKY_METRICS_HOST', '127.0.0.1')
+METRICS_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+METRICS_HELP = {
+    'bluesky_follows_total': ('counter', 'Accounts followed'),
+    'bluesky_unfollows_total': ('counter', 'Accounts unfollowed'),
+    'bluesky_rate_limit_hits_total': ('counter', '429 responses per XRPC endpoint'),
+    'bluesky_rate_limit_wait_seconds_total': ('counter', 'Seconds the client-side rate limiter held calls'),
+    'bluesky_llm_request_seconds': ('histogram', 'LLM chat completion latency'),
+    'bluesky_llm_failures_total': ('counter', 'Failed LLM requests by error type'),
+    'bluesky_db_write_seconds': ('histogram', 'SQLite write and flush latency'),
+    'bluesky_db_rows_written_total': ('counter', 'Rows written through the write queue'),
+    'bluesky_queue_depth': ('gauge', 'Items waiting in each in-process queue'),
+    'bluesky_stream_dropped_total': ('counter', 'Stream items dropped because an account\'s queue was full'),
+    'bluesky_loop_seconds_total': ('counter', 'Time each bot loop spent working and sleeping'),
+}
+# PDS to talk to, the SDK default (bsky.social) unless pointed elsewhere, e.g. at fake_server.py
+PDS_URL = os.getenv('BLUESKY_PDS_URL')
 
 
-BASE_URL = "https://api.h-s.site"
+BASE_URL = os.getenv('LLM_BASE_URL', "https://api.h-s.site")
+LLM_MODEL = "gpt-4o-mini"
+LLM_TOKEN_TTL = 600
+LLM_POOL_SIZE = 10
+LLM_TIMEOUT = 60
 
-conversation_history = deque(maxlen=20)
+# LLM memory is kept per context (post generation, each reply thread), capped by estimated tokens
+CONVERSATION_MAX_TOKENS = 2000
+CONVERSATION_CACHE_SIZE = 1000
+CONVERSATION_TTL = 7 * 86400
+
+
+class Clock:
+    # Wall-clock time for everything that schedules; SimulatedClock swaps in virtual time
+    def time(self):
+        return time.time()
+
+    def monotonic(self):
+        return time.monotonic()
+
+    def now(self, tz=None):
+        return datetime.now(tz)
+
+    def sleep(self, seconds):
+        time.sleep(seconds)
+
+    def run(self, coro):
+        return asyncio.run(coro)
 
-def get_assistant_response(system_prompt, user_prompt, record_history=True):
-    try:
-        # If recording history is enabled, add the current user prompt to the history
-        if record_history:
-            conversation_history.append({"role": "user", "content": user_prompt})
 
+class SimulatedClock(Clock):
+    # Virtual time, for replaying days of scheduling in seconds. The event loop's own clock is made
+    # virtual, so asyncio.sleep and timeouts work unchanged: whenever the loop would block waiting for
+    # a timer, time jumps to that timer instead. Calls out on worker threads are still waited for in
+    # real time, without moving the clock. This hooks the selector of asyncio's SelectorEventLoop,
+    # so run() always uses that loop and cannot drive Proactor or uvloop.
+    def __init__(self, start=None):
+        self.epoch = (start or datetime.now(utc)).timestamp()
+        self.elapsed = 0.0
+        self.busy = 0
+        self._lock = threading.Lock()
+
+    def time(self):
+        return self.epoch + self.elapsed
+
+    def monotonic(self):
+        return self.elapsed
+
+    def now(self, tz=None):
+        return datetime.fromtimestamp(self.time(), tz)
+
+    def advance(self, seconds):
+        with self._lock:
+            self.elapsed += max(seconds, 0)
+
+    def sleep(self, seconds):
+        # Blocking sleeps on worker threads just move time forward
+        self.advance(seconds)
+
+    def _call_done(self, future):
+        self.busy -= 1
+
+    def run(self, coro):
+        loop = asyncio.SelectorEventLoop()
+        selector = getattr(loop, '_selector', None)
+        if selector is None or not callable(getattr(selector, 'select', None)):
+            loop.close()
+            raise RuntimeError(f"SimulatedClock needs asyncio's selector event loop, got {type(loop).__name__}")
+        select = selector.select
+        run_in_executor = loop.run_in_executor
+
+        def virtual_select(timeout=None):
+            if self.busy or timeout is None:
+                # Worker calls and I/O are waited for in real time; a finished call wakes the selector
+                return select(timeout)
+            if timeout:
+                self.advance(timeout)
+            return select(0)
+
+        def tracked_run_in_executor(executor, func, *args):
+            future = run_in_executor(executor, func, *args)
+            self.busy += 1
+            future.add_done_callback(self._call_done)
+            return future
+
+        loop.time = self.monotonic
+        selector.select = virtual_select
+        loop.run_in_executor = tracked_run_in_executor
+        asyncio.set_event_loop(loop)
         try:
-            token_response = requests.get(f"{BASE_URL}/v1/get-token")
-            token_response.raise_for_status()
-        except requests.exceptions.RequestException as e:
-            print(f"Error getting token: {e}")
-            sys.exit(1)
+            return loop.run_until_complete(coro)
+        finally:
+            # Same teardown as asyncio.run
+            try:
+                tasks = asyncio.all_tasks(loop)
+                for task in tasks:
+                    task.cancel()
+                loop.run_until_complete(asyncio.gather(*tasks, return_exceptions=True))
+                loop.run_until_complete(loop.shutdown_asyncgens())
+                loop.run_until_complete(loop.shutdown_default_executor())
+            finally:
+                asyncio.set_event_loop(None)
+                loop.close()
+
+
+clock = Clock()
+
+
+class MetricsRegistry:
+    # Counters, histograms and scrape-time gauges, rendered in the Prometheus text format
+    def __init__(self, buckets=METRICS_BUCKETS, descriptions=METRICS_HELP):
+        self.buckets = buckets
+        self.descriptions = descriptions
+        self.counters = {}
+        self.histograms = {}
+        self.gauges = {}
+        self._lock = threading.Lock()
+
+    def inc(self, name, value=1, **labels):
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            self.counters[key] = self.counters.get(key, 0) + value
 
+    def observe(self, name, value, **labels):
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            histogram = self.histograms.get(key)
+            if histogram is None:
+                histogram = self.histograms[key] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            histogram[0][bisect.bisect_left(self.buckets, value)] += 1
+            histogram[1] += value
+            histogram[2] += 1
+
+    @contextlib.contextmanager
+    def timed(self, name, **labels):
+        start = clock.monotonic()
         try:
-            token = token_response.json()["token"]
-        except KeyError:
-            print("Error: 'token' key not found in the response.")
-            sys.exit(1)
-        except ValueError:
-            print("Error: Invalid JSON response from the server.")
-            sys.exit(1)
+            yield
+        finally:
+            self.observe(name, clock.monotonic() - start, **labels)
+
+    def gauge(self, name, read, **labels):
+        # Read at scrape time, so queue depths cost nothing between scrapes
+        with self._lock:
+            self.gauges[(name, tuple(sorted(labels.items())))] = read
+
+    @staticmethod
+    def _labels(labels, extra=()):
+        pairs = [*labels, *extra]
+        if not pairs:
+            return ''
+        escaped = (str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n') for _, value in pairs)
+        return '{' + ','.join(f'{key}="{value}"' for (key, _), value in zip(pairs, escaped)) + '}'
 
-        # Prepare the payload with the system prompt, user prompt, and conversation history
+    def render(self):
+        with self._lock:
+            counters = dict(self.counters)
+            histograms = {key: (list(counts), total, count) for key, (counts, total, count) in self.histograms.items()}
+            gauges = dict(self.gauges)
+        samples = {}
+        for (name, labels), value in counters.items():
+            samples.setdefault(name, []).append(f'{name}{self._labels(labels)} {value}')
+        for (name, labels), read in gauges.items():
+            try:
+                samples.setdefault(name, []).append(f'{name}{self._labels(labels)} {read()}')
+            except Exception as e:
+                logging.warning(f"Could not read gauge {name}: {str(e)}")
+        for (name, labels), (counts, total, count) in histograms.items():
+            lines = samples.setdefault(name, [])
+            for bound, cumulative in zip((*self.buckets, '+Inf'), itertools.accumulate(counts)):
+                lines.append(f'{name}_bucket{self._labels(labels, (("le", bound),))} {cumulative}')
+            lines.append(f'{name}_sum{self._labels(labels)} {total}')
+            lines.append(f'{name}_count{self._labels(labels)} {count}')
+        output = []
+        for name in sorted(samples):
+            kind, description = self.descriptions.get(name, ('untyped', name))
+            output += [f'# HELP {name} {description}', f'# TYPE {name} {kind}', *samples[name]]
+        return '\n'.join(output) + '\n'
+
+
+metrics = MetricsRegistry()
+
+
+class MetricsRequestHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path.split('?', 1)[0] != '/metrics':
+            self.send_error(404)
+            return
+        body = self.server.registry.render().encode()
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/plain; version=0.0.4; charset=utf-8')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def start_metrics_server(port=METRICS_PORT, host=METRICS_HOST, registry=None):
+    server = ThreadingHTTPServer((host, port), MetricsRequestHandler)
+    server.daemon_threads = True
+    server.registry = registry or metrics
+    threading.Thread(target=server.serve_forever, daemon=True, name='metrics').start()
+    logging.info(f"Serving metrics on http://{host}:{server.server_address[1]}/metrics")
+    return server
+
+
+class LLMClient:
+    def __init__(self, base_url=BASE_URL, token_ttl=LLM_TOKEN_TTL, pool_size=LLM_POOL_SIZE, timeout=LLM_TIMEOUT):
+        self.base_url = base_url
+        self.token_ttl = token_ttl
+        self.timeout = timeout
+        # One keep-alive session so token and completion requests reuse the same connections
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size)
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+        # One thread per pooled connection, so replies and drafts from every account stay within the pool
+        self.executor = ThreadPoolExecutor(max_workers=pool_size, thread_name_prefix='llm')
+        self._token = None
+        self._token_expires_at = 0.0
+        self._token_lock = threading.Lock()
+
+    def get_token(self, force_refresh=False):
+        with self._token_lock:
+            if force_refresh or self._token is None or clock.monotonic() >= self._token_expires_at:
+                response = self.session.get(f"{self.base_url}/v1/get-token", timeout=self.timeout)
+                response.raise_for_status()
+                self._token = response.json()["token"]
+                self._token_expires_at = clock.monotonic() + self.token_ttl
+            return self._token
+
+    def _post_completion(self, token, messages, model):
         payload = {
             "token": token,
-            "model": "gpt-4o-mini",
-            "message": [
-                {"role": "user", "content": system_prompt},
-                *([*conversation_history] if record_history else []),
-                {"role": "user", "content": user_prompt}
-            ],
+            "model": model,
+            "message": messages,
             "stream": False
         }
+        return self.session.post(f"{self.base_url}/v1/chat/completions", json=payload, timeout=self.timeout)
 
+    def chat(self, messages, model=LLM_MODEL):
         try:
-            response = requests.post(f"{BASE_URL}/v1/chat/completions", json=payload)
-            response.raise_for_status()
+            with metrics.timed('bluesky_llm_request_seconds'):
+                response = self._post_completion(self.get_token(), messages, model)
+                if response.status_code == 401:
+                    # Cached token was revoked or expired early, fetch a fresh one and retry once
+                    response = self._post_completion(self.get_token(force_refresh=True), messages, model)
+                response.raise_for_status()
+                return response.json()["choice"][0]["message"]["content"]
+        except Exception as e:
+            metrics.inc('bluesky_llm_failures_total', reason=type(e).__name__)
+            raise
+
+    async def run(self, func, *args, **kwargs):
+        loop = asyncio.get_running_loop()
+        context = contextvars.copy_context()
+        return await loop.run_in_executor(self.executor, context.run, functools.partial(func, *args, **kwargs))
+
+    def close(self):
+        self.executor.shutdown(wait=True)
+        self.session.close()
+
+
+llm_client = LLMClient()
+
+
+class ConversationStore:
+    # In-memory LRU of contexts in front of the conversations table; evicted contexts reload on next use
+    def __init__(self, store=None, max_tokens=CONVERSATION_MAX_TOKENS, max_contexts=CONVERSATION_CACHE_SIZE):
+        self.store = store
+        self.max_tokens = max_tokens
+        self.max_contexts = max_contexts
+        self.memory = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def count_tokens(message):
+        # Rough estimate: about four characters per token plus a few for the role
+        return len(message['content']) // 4 + 4
+
+    def _load(self, context):
+        history = self.memory.get(context)
+        if history is None:
+            data = self.store.get_conversation(context) if self.store else None
+            history = deque(json.loads(data) if data else ())
+            self.memory[context] = history
+        self.memory.move_to_end(context)
+        while len(self.memory) > self.max_contexts:
+            self.memory.popitem(last=False)
+        return history
+
+    def get(self, context):
+        with self._lock:
+            return list(self._load(context))
+
+    def append(self, context, *messages):
+        with self._lock:
+            history = self._load(context)
+            history.extend(messages)
+            tokens = sum(map(self.count_tokens, history))
+            # Oldest messages drop off once the context is over its token budget, never leaving a reply first
+            while history and (tokens > self.max_tokens or history[0]['role'] != 'user'):
+                tokens -= self.count_tokens(history.popleft())
+            if self.store:
+                self.store.put_conversation(context, json.dumps(list(history)), clock.time())
+
+
+# Memory-only default for callers that pass a context without their own store
+conversation_store = ConversationStore()
+
+
+def get_assistant_response(system_prompt, user_prompt, context=None, client=None, conversations=None):
+    client = client or llm_client
+    conversations = conversations or conversation_store
+    try:
+        try:
+            client.get_token()
         except requests.exceptions.RequestException as e:
-            print(f"Error sending request to chat completions: {e}")
+            logging.error(f"Error getting token: {str(e)}")
+            return None
+        except KeyError:
+            logging.error("'token' key not found in the token response")
             return None
+        except ValueError:
+            logging.error("Invalid JSON in the token response")
+            return None
+
+        # Prepare the messages with the system prompt, the context's history and the user prompt
+        prompt = {"role": "user", "content": user_prompt}
+        messages = [
+            {"role": "user", "content": system_prompt},
+            *(conversations.get(context) if context else []),
+            prompt
+        ]
 
         try:
-            response_data = response.json()
-            content = response_data["choice"][0]["message"]["content"]
-            # If recording history is enabled, add the assistant's response to the history
-            if record_history:
-                conversation_history.append({"role": "assistant", "content": content})
-            return content
+            content = client.chat(messages)
+        except requests.exceptions.RequestException as e:
+            logging.error(f"Error sending request to chat completions: {str(e)}")
+            return None
         except KeyError as e:
-            print(f"Error: Missing expected key in the response - {e}")
+            logging.error(f"Missing expected key in the chat completion response: {str(e)}")
             return None
         except IndexError:
-            print("Error: No choices found in the response.")
+            logging.error("No choices found in the chat completion response")
             return None
         except ValueError:
-            print("Error: Invalid JSON response from the server.")
+            logging.error("Invalid JSON in the chat completion response")
             return None
 
+        # Only exchanges that got an answer go into the context's history
+        if context:
+            conversations.append(context, prompt, {"role": "assistant", "content": content})
+        return content
+
     except Exception as e:
-        print(f"An unexpected error occurred: {e}")
+        logging.error(f"Unexpected error getting assistant response: {str(e)}", exc_info=True)
+        return None
+
+
+# Character categories that attach to the preceding character instead of starting a new grapheme
+GRAPHEME_EXTEND_CATEGORIES = frozenset(('Mn', 'Me', 'Mc'))
+ZWJ = '\u200d'
+FACET_PATTERN = re.compile(
+    r'(?P<link>(?<![\w@/])https?://[^\s<>"]+)'
+    r'|(?P<mention>(?<![\w@])@(?P<handle>(?:[a-zA-Z0-9](?:[a-zA-Z0-9-]{0,61}[a-zA-Z0-9])?\.)+'
+    r'[a-zA-Z](?:[a-zA-Z0-9-]{0,61}[a-zA-Z0-9])?))'
+    r'|(?P<tag>(?<!\S)[#\uff03](?P<tag_name>[^\s#\uff03]+))'
+)
+LINK_TRAILING_PUNCTUATION = '.,;:!?"\''
+TAG_MAX_LENGTH = 64
+
+
+def scan_text(text):
+    # One pass over the text for grapheme cluster starts and the UTF-8 byte offset of every character.
+    # Covers combining marks (incl. Indic vowel signs), ZWJ emoji sequences, variation selectors,
+    # skin tones, tag sequences, flag pairs and CRLF, which is what the 300-grapheme limit trips on.
+    starts = []
+    byte_at = [0] * (len(text) + 1)
+    offset = 0
+    previous = ''
+    regional = 0
+    for index, char in enumerate(text):
+        code = ord(char)
+        if code < 0x300:
+            joins = previous == ZWJ or (previous == '\r' and char == '\n')
+            regional = 0
+        elif 0x1F1E6 <= code <= 0x1F1FF:
+            regional += 1
+            joins = previous == ZWJ or regional % 2 == 0
+        else:
+            regional = 0
+            joins = (previous == ZWJ or char == ZWJ
+                     or 0xFE00 <= code <= 0xFE0F or 0x1F3FB <= code <= 0x1F3FF or 0xE0020 <= code <= 0xE007F
+                     or unicodedata.category(char) in GRAPHEME_EXTEND_CATEGORIES)
+        if not joins or not starts:
+            starts.append(index)
+        offset += 1 if code < 0x80 else 2 if code < 0x800 else 3 if code < 0x10000 else 4
+        byte_at[index + 1] = offset
+        previous = char
+    return starts, byte_at
+
+
+def count_graphemes(text):
+    return len(scan_text(text)[0])
+
+
+def detect_facets(text):
+    # Links, mentions and hashtags come out of a single regex pass, as (start, end, kind, value) character spans
+    spans = []
+    for match in FACET_PATTERN.finditer(text):
+        if match.group('link'):
+            start, end = match.span('link')
+            while end > start and (text[end - 1] in LINK_TRAILING_PUNCTUATION
+                                   or (text[end - 1] == ')' and text.count('(', start, end) < text.count(')', start, end))):
+                end -= 1
+            spans.append((start, end, 'link', text[start:end]))
+        elif match.group('mention'):
+            start, end = match.span('mention')
+            spans.append((start, end, 'mention', match.group('handle').lower()))
+        else:
+            start, end = match.span('tag')
+            tag = match.group('tag_name')
+            while tag and unicodedata.category(tag[-1]).startswith('P'):
+                tag = tag[:-1]
+            if not tag or tag.isdigit() or len(tag) > TAG_MAX_LENGTH:
+                continue
+            spans.append((start, start + 1 + len(tag), 'tag', tag))
+    return spans
+
+
+def _split_point(text, chunk_start, limit, spans):
+    # Break at the last whitespace that fits and isn't inside a facet, else hard-cut before the facet
+    inside = [(start, end) for start, end, _, _ in spans if start < limit and end > chunk_start]
+    for index in range(limit, chunk_start, -1):
+        if text[index].isspace() and not any(start < index < end for start, end in inside):
+            return index
+    for start, end in inside:
+        if start < limit < end and start > chunk_start:
+            return start
+    return limit
+
+
+def split_post(text, max_graphemes=POST_MAX_GRAPHEMES):
+    # Returns [(chunk_text, [(byte_start, byte_end, kind, value)])], byte offsets relative to each chunk
+    text = text.strip()
+    starts, byte_at = scan_text(text)
+    spans = detect_facets(text)
+    chunks = []
+    first = 0
+    while first < len(starts):
+        chunk_start = starts[first]
+        if len(starts) - first <= max_graphemes:
+            chunk_end = len(text)
+        else:
+            chunk_end = _split_point(text, chunk_start, starts[first + max_graphemes], spans)
+        chunk = text[chunk_start:chunk_end].rstrip()
+        chunk_end = chunk_start + len(chunk)
+        base = byte_at[chunk_start]
+        chunks.append((chunk, [(byte_at[start] - base, byte_at[end] - base, kind, value)
+                               for start, end, kind, value in spans if start >= chunk_start and end <= chunk_end]))
+
+        next_start = chunk_end
+        while next_start < len(text) and text[next_start].isspace():
+            next_start += 1
+        first = bisect.bisect_left(starts, next_start)
+    return chunks
+
+
+def clean_draft(text):
+    if not text:
+        return None
+    # The prompt asks for no wrapping quotes, but the model doesn't always listen
+    text = text.strip().strip('"\u201c\u201d').strip()
+    if not text or len(text) > POST_DRAFT_MAX_LENGTH:
+        return None
+    return text
+
+
+class PostCalendar:
+    def __init__(self, windows=POST_WINDOWS, tz=POST_TIMEZONE, seed='', days=POST_CALENDAR_DAYS):
+        self.windows = [(datetime.strptime(start, '%H:%M').time(), datetime.strptime(end, '%H:%M').time())
+                        for start, end in windows]
+        self.tz = tz
+        self.seed = seed
+        self.days = days
+        self.slots = []
+
+    def build(self, start_date):
+        slots = []
+        for offset in range(self.days):
+            day = start_date + timedelta(days=offset)
+            for index, (start, end) in enumerate(self.windows):
+                # Jitter is seeded per account, day and window so a restart lands on the same slot
+                rng = random.Random(f"{self.seed}:{day.isoformat()}:{index}")
+                window_start = self.tz.localize(datetime.combine(day, start))
+                window_end = self.tz.localize(datetime.combine(day, end))
+                jitter = rng.uniform(0, (window_end - window_start).total_seconds())
+                slots.append((window_start + timedelta(seconds=jitter)).astimezone(utc))
+        self.slots = sorted(slots)
+
+    def next_slot(self, after):
+        if not self.slots or self.slots[0] > after or self.slots[-1] <= after:
+            self.build(after.astimezone(self.tz).date() - timedelta(days=1))
+        return self.slots[bisect.bisect_right(self.slots, after)]
+
+
+class FollowPacer:
+    def __init__(self, daily_limit, tz=POST_TIMEZONE, active_hours=FOLLOW_ACTIVE_HOURS, jitter=FOLLOW_PACING_JITTER):
+        self.daily_limit = daily_limit
+        self.tz = tz
+        self.active_start, self.active_end = (datetime.strptime(value, '%H:%M').time() for value in active_hours)
+        self.jitter = jitter
+        self.window_start = None
+        self.count = 0
+        self.last_follow = None
+
+    def window(self, now):
+        # Today's active hours in the bot's timezone, or tomorrow's once today's have ended
+        day = now.astimezone(self.tz).date()
+        end = self.tz.localize(datetime.combine(day, self.active_end))
+        if now >= end:
+            day += timedelta(days=1)
+            end = self.tz.localize(datetime.combine(day, self.active_end))
+        return self.tz.localize(datetime.combine(day, self.active_start)), end
+
+    def start_window(self, window_start, count):
+        self.window_start = window_start
+        self.count = count
+
+    def next_delay(self, now):
+        # Seconds to wait before the next follow: the remaining budget spread evenly over what is left
+        # of the window, with jitter so follows don't land on a visible fixed interval
+        window_start, window_end = self.window(now)
+        if window_start != self.window_start:
+            self.start_window(window_start, 0)
+        remaining = self.daily_limit - self.count
+        # Follows are never closer together than FOLLOW_DELAY_MIN, and one at the window's very end
+        # would count towards the next window
+        earliest = max(now, (self.last_follow or now) + timedelta(seconds=FOLLOW_DELAY_MIN))
+        last_slot = window_end - timedelta(seconds=1)
+        if remaining <= 0 or earliest > last_slot:
+            # Budget spent, or no room left at the minimum spacing: the rest waits for the next window
+            window_start, window_end = self.window(window_end)
+            remaining = self.daily_limit
+        if now < window_start:
+            # The first follow of a window goes out somewhere inside its first interval
+            interval = (window_end - window_start).total_seconds() / remaining
+            return (window_start - now).total_seconds() + random.uniform(0, interval)
+        interval = (window_end - now).total_seconds() / remaining
+        delay = max((earliest - now).total_seconds(), interval * random.uniform(1 - self.jitter, 1 + self.jitter))
+        return min(delay, (last_slot - now).total_seconds())
+
+    def record_follow(self, now):
+        window_start, _ = self.window(now)
+        if window_start != self.window_start:
+            self.start_window(window_start, 0)
+        self.count += 1
+        self.last_follow = now
+
+
+class TokenBucket:
+    def __init__(self, limit, window):
+        self.capacity = float(limit)
+        self.rate = limit / window
+        self.tokens = float(limit)
+        self.updated = clock.monotonic()
+        self.reset_at = None
+
+    def _refill(self, now):
+        if self.reset_at is None:
+            self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        elif now >= self.reset_at:
+            # Server windows are fixed, the whole budget comes back at once on reset
+            self.tokens = min(self.capacity, self.tokens + self.capacity)
+            self.reset_at = None
+        self.updated = now
+
+    def reserve(self):
+        # Takes a token now and returns how long the caller must wait before using it
+        now = clock.monotonic()
+        self._refill(now)
+        self.tokens -= 1
+        if self.tokens >= 0:
+            return 0.0
+        if self.reset_at is not None:
+            return self.reset_at - now + max(-self.tokens - self.capacity, 0) / self.rate
+        return -self.tokens / self.rate
+
+    def sync(self, limit, remaining, window, reset_at):
+        # The server's count wins, it also sees requests made by other clients on the same account
+        now = clock.monotonic()
+        self._refill(now)
+        self.capacity = float(limit)
+        self.rate = limit / window
+        self.tokens = min(self.tokens, float(remaining))
+        if reset_at:
+            # Reset is in whole epoch seconds, pad by one so we never land just before it
+            self.reset_at = now + max(reset_at - clock.time(), 0) + 1
+
+
+class RateLimiter:
+    def __init__(self, default_limit=RATE_LIMIT_DEFAULT, default_window=RATE_LIMIT_DEFAULT_WINDOW):
+        self.default_limit = default_limit
+        self.default_window = default_window
+        self.buckets = {}
+        self._lock = threading.Lock()
+
+    def _bucket(self, endpoint):
+        if endpoint not in self.buckets:
+            self.buckets[endpoint] = TokenBucket(self.default_limit, self.default_window)
+        return self.buckets[endpoint]
+
+    def acquire(self, endpoint):
+        with self._lock:
+            wait = self._bucket(endpoint).reserve()
+        if wait > 0:
+            logging.info(f"Rate limiter holding {endpoint} for {wait:.1f} seconds")
+            metrics.inc('bluesky_rate_limit_wait_seconds_total', wait, endpoint=endpoint)
+            clock.sleep(wait)
+
+    def update(self, endpoint, headers):
+        try:
+            limit = int(headers['ratelimit-limit'])
+            remaining = int(headers['ratelimit-remaining'])
+        except (KeyError, TypeError, ValueError):
+            return
+        # Policy looks like "3000;w=300", the window is in seconds
+        window = self.default_window
+        for part in headers.get('ratelimit-policy', '').split(';')[1:]:
+            key, _, value = part.strip().partition('=')
+            if key == 'w' and value.isdigit():
+                window = int(value)
+        reset_at = headers.get('ratelimit-reset')
+        with self._lock:
+            self._bucket(endpoint).sync(limit, remaining, window, int(reset_at) if reset_at and reset_at.isdigit() else None)
+
+
+class RateLimitedRequest(Request):
+    # atproto Request that paces every XRPC call through a per-endpoint RateLimiter,
+    # optionally sending through a shared httpx pool while keeping its own auth headers
+    def __init__(self, rate_limiter, http_client=None):
+        self._owns_client = http_client is None
+        if self._owns_client:
+            super().__init__()
+        else:
+            RequestBase.__init__(self)
+            self._client_kwargs = {}
+            self._client = http_client
+        self.rate_limiter = rate_limiter
+
+    def _new_instance(self):
+        return type(self)(self.rate_limiter, None if self._owns_client else self._client)
+
+    def _send_request(self, method, url, **kwargs):
+        endpoint = url.rsplit('/', 1)[-1]
+        self.rate_limiter.acquire(endpoint)
+        try:
+            response = super()._send_request(method, url, **kwargs)
+        except exceptions.RequestErrorBase as e:
+            if isinstance(e, exceptions.RateLimitExceededError):
+                metrics.inc('bluesky_rate_limit_hits_total', endpoint=endpoint)
+            if e.response is not None:
+                self.rate_limiter.update(endpoint, e.response.headers)
+            raise
+        self.rate_limiter.update(endpoint, response.headers)
+        return response
+
+    def close(self):
+        # A shared pool is owned by whoever created it
+        if self._owns_client:
+            super().close()
+
+
+class FollowStore:
+    SCHEMA = (
+        '''
+        CREATE TABLE IF NOT EXISTS followed_users (
+            did TEXT PRIMARY KEY,
+            handle TEXT,
+            followed_at TIMESTAMP,
+            unfollowed BOOLEAN DEFAULT 0,
+            follow_uri TEXT
+        )
+        ''',
+        '''
+        CREATE TABLE IF NOT EXISTS sessions (
+            handle TEXT PRIMARY KEY,
+            session_string TEXT,
+            updated_at TIMESTAMP
+        )
+        ''',
+        '''
+        CREATE TABLE IF NOT EXISTS post_slots (
+            slot_at TEXT PRIMARY KEY,
+            posted_at TEXT,
+            uri TEXT
+        )
+        ''',
+        '''
+        CREATE TABLE IF NOT EXISTS post_drafts (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            text TEXT UNIQUE,
+            created_at TEXT,
+            attempts INTEGER DEFAULT 0
+        )
+        ''',
+        '''
+        CREATE TABLE IF NOT EXISTS candidates (
+            did TEXT PRIMARY KEY,
+            handle TEXT,
+            source TEXT,
+            score REAL,
+            discovered_at TEXT,
+            status INTEGER DEFAULT 0
+        )
+        ''',
+        '''
+        CREATE TABLE IF NOT EXISTS source_cursors (
+            source TEXT PRIMARY KEY,
+            cursor TEXT
+        )
+        ''',
+        '''
+        CREATE TABLE IF NOT EXISTS profiles (
+            did TEXT PRIMARY KEY,
+            data TEXT,
+            fetched_at REAL
+        )
+        ''',
+        '''
+        CREATE TABLE IF NOT EXISTS followers (
+            did TEXT PRIMARY KEY,
+            first_seen TIMESTAMP
+        ) WITHOUT ROWID
+        ''',
+        '''
+        CREATE TABLE IF NOT EXISTS replies (
+            mention_uri TEXT PRIMARY KEY,
+            reply_uri TEXT,
+            replied_at TEXT
+        ) WITHOUT ROWID
+        ''',
+        '''
+        CREATE TABLE IF NOT EXISTS conversations (
+            context TEXT PRIMARY KEY,
+            messages TEXT,
+            updated_at REAL
+        )
+        ''',
+    )
+    # Columns added after the table first shipped, applied to existing databases on open
+    MIGRATIONS = (
+        ('followed_users', 'follow_uri', 'TEXT'),
+    )
+    INDEXES = (
+        'CREATE INDEX IF NOT EXISTS idx_followed_users_due ON followed_users (unfollowed, followed_at)',
+        'CREATE INDEX IF NOT EXISTS idx_candidates_queue ON candidates (status, score DESC)',
+        'CREATE INDEX IF NOT EXISTS idx_profiles_fetched ON profiles (fetched_at)',
+        'CREATE INDEX IF NOT EXISTS idx_conversations_updated ON conversations (updated_at)',
+    )
+
+    def __init__(self, db_path, flush_interval=DB_FLUSH_INTERVAL, max_batch=DB_MAX_BATCH):
+        self.flush_interval = flush_interval
+        self.max_batch = max_batch
+        self.conn = sqlite3.connect(db_path, check_same_thread=False, cached_statements=256)
+        self.conn.execute('PRAGMA journal_mode=WAL')
+        # WAL with synchronous=NORMAL only fsyncs on checkpoint, not on every commit
+        self.conn.execute('PRAGMA synchronous=NORMAL')
+        self._lock = threading.RLock()
+        self._pending = []
+        with self._lock, self.conn:
+            for statement in self.SCHEMA:
+                self.conn.execute(statement)
+            for table, column, declaration in self.MIGRATIONS:
+                columns = {row[1] for row in self.conn.execute(f'PRAGMA table_info({table})')}
+                if column not in columns:
+                    self.conn.execute(f'ALTER TABLE {table} ADD COLUMN {column} {declaration}')
+            for statement in self.INDEXES:
+                self.conn.execute(statement)
+        # Active follows live in memory so dedup checks never touch the DB; kept in sync with every write
+        self._followed = {row[0] for row in self.conn.execute('SELECT did FROM followed_users WHERE unfollowed = 0')}
+        self._followers = {row[0] for row in self.conn.execute('SELECT did FROM followers')}
+
+    def query(self, sql, params=()):
+        with self._lock:
+            return self.conn.execute(sql, params).fetchall()
+
+    def query_one(self, sql, params=()):
+        with self._lock:
+            return self.conn.execute(sql, params).fetchone()
+
+    def write(self, sql, params=()):
+        with self._lock:
+            # Keep queued writes ordered before this one
+            self.flush()
+            with metrics.timed('bluesky_db_write_seconds', op='write'), self.conn:
+                self.conn.execute(sql, params)
+            metrics.inc('bluesky_db_rows_written_total')
+
+    @property
+    def pending(self):
+        return len(self._pending)
+
+    def enqueue(self, sql, params=()):
+        with self._lock:
+            self._pending.append((sql, params))
+            if len(self._pending) >= self.max_batch:
+                self.flush()
+
+    def flush(self):
+        with self._lock:
+            if not self._pending:
+                return 0
+            pending, self._pending = self._pending, []
+            try:
+                with metrics.timed('bluesky_db_write_seconds', op='flush'), self.conn:
+                    # Consecutive rows for the same statement go through one executemany
+                    for sql, rows in itertools.groupby(pending, key=lambda item: item[0]):
+                        self.conn.executemany(sql, [params for _, params in rows])
+            except Exception:
+                # The transaction rolled back, keep the rows queued ahead of anything added since
+                self._pending[:0] = pending
+                raise
+            metrics.inc('bluesky_db_rows_written_total', len(pending))
+            return len(pending)
+
+    def record_follow(self, did, handle, followed_at, follow_uri=None):
+        with self._lock:
+            self._followed.add(did)
+            self.enqueue('INSERT OR REPLACE INTO followed_users (did, handle, followed_at, unfollowed, follow_uri) '
+                         'VALUES (?, ?, ?, 0, ?)', (did, handle, followed_at, follow_uri))
+
+    def mark_unfollowed(self, did):
+        with self._lock:
+            self._followed.discard(did)
+            self.enqueue('UPDATE followed_users SET unfollowed = 1 WHERE did = ?', (did,))
+
+    def is_followed(self, did):
+        with self._lock:
+            return did in self._followed
+
+    def filter_not_followed(self, dids):
+        with self._lock:
+            return [did for did in dids if did not in self._followed]
+
+    def is_follower(self, did):
+        with self._lock:
+            return did in self._followers
+
+    def add_followers(self, dids, seen_at):
+        with self._lock:
+            new = [did for did in dict.fromkeys(dids) if did not in self._followers]
+            self._followers.update(new)
+            for did in new:
+                self.enqueue('INSERT OR IGNORE INTO followers (did, first_seen) VALUES (?, ?)', (did, seen_at))
+            return new
+
+    def prune_followers(self, current_dids):
+        with self._lock:
+            gone = self._followers - set(current_dids)
+            self._followers -= gone
+            for did in gone:
+                self.enqueue('DELETE FROM followers WHERE did = ?', (did,))
+            return gone
+
+    def last_post_slot(self):
+        row = self.query_one('SELECT MAX(slot_at) FROM post_slots')
+        return datetime.fromisoformat(row[0]) if row and row[0] else None
+
+    def record_post_slot(self, slot_at, uri):
+        # Written through immediately so a crash right after posting can't post the same slot twice
+        self.write('INSERT OR REPLACE INTO post_slots (slot_at, posted_at, uri) VALUES (?, ?, ?)',
+                   (slot_at.astimezone(utc).isoformat(), clock.now(utc).isoformat(), uri))
+
+    def count_drafts(self):
+        return self.query_one('SELECT COUNT(*) FROM post_drafts')[0]
+
+    def add_draft(self, text):
+        with self._lock:
+            self.flush()
+            with self.conn:
+                cursor = self.conn.execute('INSERT OR IGNORE INTO post_drafts (text, created_at) VALUES (?, ?)',
+                                           (text, clock.now(utc).isoformat()))
+            return cursor.rowcount
+
+    def next_draft(self):
+        return self.query_one('SELECT id, text FROM post_drafts ORDER BY id LIMIT 1')
+
+    def delete_draft(self, draft_id):
+        self.write('DELETE FROM post_drafts WHERE id = ?', (draft_id,))
+
+    def fail_draft(self, draft_id, max_attempts):
+        self.write('UPDATE post_drafts SET attempts = attempts + 1 WHERE id = ?', (draft_id,))
+        self.write('DELETE FROM post_drafts WHERE id = ? AND attempts >= ?', (draft_id, max_attempts))
+
+    def count_follows_since(self, since):
+        self.flush()
+        return self.query_one('SELECT COUNT(*) FROM followed_users WHERE followed_at >= ?', (since,))[0]
+
+    def add_candidates(self, users, source, score):
+        # Seen again from another source means a stronger signal, so scores add up
+        discovered_at = clock.now(utc).isoformat()
+        for user in users:
+            self.enqueue('INSERT INTO candidates (did, handle, source, score, discovered_at) VALUES (?, ?, ?, ?, ?) '
+                         'ON CONFLICT(did) DO UPDATE SET score = score + excluded.score',
+                         (user.did, user.handle, source, score, discovered_at))
+        return len(users)
+
+    def pop_candidates(self, limit):
+        with self._lock:
+            self.flush()
+            rows = self.query('SELECT did, handle FROM candidates WHERE status = 0 '
+                              'ORDER BY score DESC, discovered_at LIMIT ?', (limit,))
+            with self.conn:
+                self.conn.executemany('UPDATE candidates SET status = 1 WHERE did = ?', [(did,) for did, _ in rows])
+            return rows
+
+    def count_queued_candidates(self):
+        self.flush()
+        return self.query_one('SELECT COUNT(*) FROM candidates WHERE status = 0')[0]
+
+    def get_cursor(self, source):
+        row = self.query_one('SELECT cursor FROM source_cursors WHERE source = ?', (source,))
+        return row[0] if row else None
+
+    def set_cursor(self, source, cursor):
+        self.enqueue('INSERT OR REPLACE INTO source_cursors (source, cursor) VALUES (?, ?)', (source, cursor))
+
+    def has_replied(self, mention_uri):
+        with self._lock:
+            # Replies are recorded through the write queue, which has to land before the check
+            self.flush()
+            return self.query_one('SELECT 1 FROM replies WHERE mention_uri = ?', (mention_uri,)) is not None
+
+    def record_reply(self, mention_uri, reply_uri, replied_at):
+        # A NULL reply_uri marks a mention that was given up on, so it isn't retried
+        self.enqueue('INSERT OR REPLACE INTO replies (mention_uri, reply_uri, replied_at) VALUES (?, ?, ?)',
+                     (mention_uri, reply_uri, replied_at))
+
+    def random_follower(self):
+        with self._lock:
+            return random.choice(tuple(self._followers)) if self._followers else None
+
+    def recent_post_uris(self, limit):
+        return [row[0] for row in self.query('SELECT uri FROM post_slots WHERE uri IS NOT NULL '
+                                             'ORDER BY slot_at DESC LIMIT ?', (limit,))]
+
+    def get_profiles(self, dids, fresh_after):
+        placeholders = ','.join('?' * len(dids))
+        return self.query(f'SELECT did, data, fetched_at FROM profiles WHERE did IN ({placeholders}) AND fetched_at >= ?',
+                          (*dids, fresh_after))
+
+    def put_profile(self, did, data, fetched_at):
+        self.enqueue('INSERT OR REPLACE INTO profiles (did, data, fetched_at) VALUES (?, ?, ?)', (did, data, fetched_at))
+
+    def prune_profiles(self, fetched_before):
+        self.write('DELETE FROM profiles WHERE fetched_at < ?', (fetched_before,))
+
+    def get_conversation(self, context):
+        with self._lock:
+            # A context evicted from memory may still have its last update in the write queue
+            self.flush()
+            row = self.query_one('SELECT messages FROM conversations WHERE context = ?', (context,))
+            return row[0] if row else None
+
+    def put_conversation(self, context, messages, updated_at):
+        self.enqueue('INSERT OR REPLACE INTO conversations (context, messages, updated_at) VALUES (?, ?, ?)',
+                     (context, messages, updated_at))
+
+    def prune_conversations(self, updated_before):
+        self.write('DELETE FROM conversations WHERE updated_at < ?', (updated_before,))
+
+    def iter_due_unfollows(self, cutoff, page_size):
+        # Keyset pagination over the (unfollowed, followed_at) index, so each page only reads due rows
+        self.flush()
+        last = ('', '')
+        while True:
+            rows = self.query('''
+                SELECT did, handle, follow_uri, followed_at FROM followed_users
+                WHERE unfollowed = 0 AND followed_at <= ? AND (followed_at, did) > (?, ?)
+                ORDER BY followed_at, did LIMIT ?
+            ''', (cutoff, *last, page_size))
+            if not rows:
+                return
+            yield rows
+            last = (rows[-1][3], rows[-1][0])
+
+    def close(self):
+        with self._lock:
+            self.flush()
+            self.conn.close()
+
+
+class CriteriaMatcher:
+    # Rule field names as they appear in config, mapped to attributes on atproto profile views
+    FIELDS = {'handle': 'handle', 'displayName': 'display_name', 'description': 'description'}
+
+    def __init__(self, include=(), exclude=(), include_patterns=(), exclude_patterns=(), fields=('handle',),
+                 min_followers=None, max_followers=None, min_posts=None):
+        self.include_terms = list(include)
+        self.fields = [self.FIELDS[field] for field in fields]
+        self.include = self._compile(include, include_patterns)
+        self.exclude = self._compile(exclude, exclude_patterns)
+        self.min_followers = min_followers
+        self.max_followers = max_followers
+        self.min_posts = min_posts
+        # Counts aren't part of the profile views that list endpoints return
+        self.needs_profiles = any(limit is not None for limit in (min_followers, max_followers, min_posts))
+
+    @staticmethod
+    def _trie_pattern(terms):
+        # Factor the terms into a prefix trie so the regex engine walks it like an automaton
+        # instead of retrying every alternative at every position
+        trie = {}
+        for term in terms:
+            node = trie
+            for char in term.lower():
+                node = node.setdefault(char, {})
+            node[''] = {}
+
+        def build(node):
+            if '' in node and len(node) == 1:
+                return ''
+            branches = [re.escape(char) + build(child) for char, child in sorted(node.items()) if char]
+            pattern = branches[0] if len(branches) == 1 else f"(?:{'|'.join(branches)})"
+            return f'(?:{pattern})?' if '' in node else pattern
+
+        return build(trie)
+
+    @classmethod
+    def _compile(cls, terms, patterns):
+        parts = ([cls._trie_pattern(terms)] if terms else []) + list(patterns)
+        return re.compile('|'.join(f'(?:{part})' for part in parts), re.IGNORECASE) if parts else None
+
+    def _matches(self, regex, users):
+        # Each field value is searched on its own, so anchors and multi-character patterns
+        # mean the same thing whatever else is on the page
+        search = regex.search
+        return [any(search(getattr(user, attribute, None) or '') for attribute in self.fields) for user in users]
+
+    def accepts_profile(self, profile):
+        return ((self.min_followers is None or profile.followers_count >= self.min_followers)
+                and (self.max_followers is None or profile.followers_count <= self.max_followers)
+                and (self.min_posts is None or profile.posts_count >= self.min_posts))
+
+    def filter(self, users):
+        users = list(users)
+        included = self._matches(self.include, users) if self.include else [True] * len(users)
+        excluded = self._matches(self.exclude, users) if self.exclude else [False] * len(users)
+        return [user for user, include, exclude in zip(users, included, excluded) if include and not exclude]
+
+
+Profile = namedtuple('Profile', ['did', 'handle', 'display_name', 'description',
+                                 'followers_count', 'follows_count', 'posts_count'])
+
+
+class ProfileCache:
+    # Two levels: an in-memory LRU in front of the profiles table, both expiring after ttl seconds
+    def __init__(self, store, fetch, ttl=PROFILE_CACHE_TTL, max_entries=PROFILE_CACHE_SIZE):
+        self.store = store
+        self.fetch = fetch
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.memory = OrderedDict()
+
+    def _remember(self, profile, fetched_at):
+        self.memory[profile.did] = (fetched_at, profile)
+        self.memory.move_to_end(profile.did)
+        while len(self.memory) > self.max_entries:
+            self.memory.popitem(last=False)
+
+    def get_many(self, dids):
+        now = clock.time()
+        profiles = {}
+        missing = []
+        for did in dict.fromkeys(dids):
+            cached = self.memory.get(did)
+            if cached and now - cached[0] < self.ttl:
+                self.memory.move_to_end(did)
+                profiles[did] = cached[1]
+            else:
+                missing.append(did)
+
+        if missing:
+            for did, data, fetched_at in self.store.get_profiles(missing, now - self.ttl):
+                profile = Profile(**json.loads(data))
+                profiles[did] = profile
+                self._remember(profile, fetched_at)
+            missing = [did for did in missing if did not in profiles]
+
+        # getProfiles takes at most PROFILE_BATCH_SIZE actors per call
+        for start in range(0, len(missing), PROFILE_BATCH_SIZE):
+            for view in self.fetch(missing[start:start + PROFILE_BATCH_SIZE]):
+                profile = Profile(view.did, view.handle, view.display_name, view.description,
+                                  view.followers_count or 0, view.follows_count or 0, view.posts_count or 0)
+                profiles[profile.did] = profile
+                self._remember(profile, now)
+                self.store.put_profile(profile.did, json.dumps(profile._asdict()), now)
+        return profiles
+
+
+StreamItem = namedtuple('StreamItem', ['kind', 'did', 'uri', 'cid', 'text', 'record'])
+
+
+class StreamSubscription:
+    def __init__(self, did, handle, terms, queue_size=JETSTREAM_QUEUE_SIZE):
+        self.did = did
+        self.handle = handle
+        self.mention = f'@{handle}'.lower() if handle else None
+        self.keywords = re.compile(CriteriaMatcher._trie_pattern(terms), re.IGNORECASE) if terms else None
+        # Bounded: when this account's bot falls behind its items are dropped, the shared stream never waits
+        self.queue = asyncio.Queue(maxsize=queue_size)
+        self.dropped = 0
+        self._dropping = False
+
+    def offer(self, item):
+        try:
+            self.queue.put_nowait(item)
+        except asyncio.QueueFull:
+            self.dropped += 1
+            metrics.inc('bluesky_stream_dropped_total', account=self.handle, kind=item.kind)
+            if not self._dropping:
+                logging.warning(f"Stream queue for {self.handle} is full, dropping items until it drains")
+            self._dropping = True
+            return False
+        self._dropping = False
+        return True
+
+    def text_patterns(self):
+        # Lowercase byte patterns for the raw post text: the mention and the keyword trie
+        patterns = [re.escape(self.mention.encode())] if self.mention else []
+        if self.keywords:
+            patterns.append(self.keywords.pattern.encode())
+        return patterns
+
+    def classify(self, did, text, record):
+        if did == self.did:
+            return None
+        for facet in record.get('facets') or ():
+            for feature in facet.get('features') or ():
+                if feature.get('did') == self.did:
+                    return 'mention'
+        if self.mention and self.mention in text.lower():
+            return 'mention'
+        if self.keywords and self.keywords.search(text):
+            return 'candidate'
         return None
 
 
+class JetstreamConsumer:
+    # Byte markers that hold with or without whitespace after JSON separators
+    POST_MARKER = b'"app.bsky.feed.post"'
+    CREATE_MARKER = b'"create"'
+    TEXT_KEY = b'"text":'
+    # Unrolled form of a JSON string body, much faster than an alternation per character
+    TEXT_VALUE = re.compile(rb'[^"\\]*(?:\\.[^"\\]*)*')
+
+    def __init__(self, url=JETSTREAM_URL):
+        self.url = url
+        self.subscriptions = []
+        self.did_markers = []
+        self.text_prefilter = None
+        self.cursor = None
+        self.last_line = None
+        self.events = 0
+        self.matched = 0
+
+    def subscribe(self, did, handle, terms):
+        subscription = StreamSubscription(did, handle, terms)
+        self.subscriptions.append(subscription)
+        # Raw-bytes checks reject most events before any JSON decoding: a substring test for each
+        # subscriber's DID (facet mentions) and one combined regex over the lowercased post text
+        self.did_markers.append(did.encode())
+        patterns = [pattern for subscription in self.subscriptions for pattern in subscription.text_patterns()]
+        self.text_prefilter = re.compile(b'|'.join(b'(?:%s)' % pattern for pattern in patterns)) if patterns else None
+        return subscription
+
+    async def handle_line(self, line):
+        self.events += 1
+        self.last_line = line
+        if self.POST_MARKER not in line or self.CREATE_MARKER not in line:
+            return
+        text = b''
+        text_start = line.find(self.TEXT_KEY)
+        if text_start >= 0:
+            text_start = line.find(b'"', text_start + len(self.TEXT_KEY)) + 1
+            text = self.TEXT_VALUE.match(line, text_start).group()
+        if not ((self.text_prefilter and self.text_prefilter.search(text.lower()))
+                or any(marker in line for marker in self.did_markers)):
+            return
+
+        event = json.loads(line)
+        commit = event.get('commit') or {}
+        if commit.get('collection') != 'app.bsky.feed.post' or commit.get('operation') != 'create':
+            return
+        record = commit.get('record') or {}
+        text = record.get('text', '')
+        uri = f"at://{event['did']}/{commit['collection']}/{commit['rkey']}"
+        for subscription in self.subscriptions:
+            kind = subscription.classify(event['did'], text, record)
+            if kind:
+                self.matched += 1
+                subscription.offer(StreamItem(kind, event['did'], uri, commit.get('cid'), text, record))
+
+    async def replay(self, path):
+        with open(path, 'rb') as f:
+            for line in f:
+                await self.handle_line(line.rstrip(b'\n'))
+
+    async def run(self):
+        while True:
+            url = f'{self.url}?wantedCollections=app.bsky.feed.post'
+            if self.cursor:
+                # Rewind a few seconds on reconnect, duplicates are cheaper than gaps
+                url += f'&cursor={self.cursor - JETSTREAM_REWIND_US}'
+            try:
+                async with websocket_connect(url, max_size=None) as websocket:
+                    logging.info(f"Connected to Jetstream at {self.url}")
+                    async for message in websocket:
+                        await self.handle_line(message.encode() if isinstance(message, str) else message)
+            except Exception as e:
+                logging.error(f"Jetstream connection error: {str(e)}", exc_info=True)
+            # Only the last event's timestamp is needed to resume, so it's decoded once per reconnect
+            if self.last_line:
+                try:
+                    self.cursor = json.loads(self.last_line).get('time_us', self.cursor)
+                except ValueError:
+                    pass
+            await asyncio.sleep(JETSTREAM_RECONNECT_DELAY)
+
+
+def _cbor_head(buf, pos):
+    initial = buf[pos]
+    info = initial & 0x1f
+    if info < 24:
+        return initial >> 5, info, pos + 1
+    size = 1 << (info - 24)
+    return initial >> 5, int.from_bytes(buf[pos + 1:pos + 1 + size], 'big'), pos + 1 + size
+
+
+def _cbor_skip(buf, pos):
+    major, arg, pos = _cbor_head(buf, pos)
+    if major == 2 or major == 3:
+        return pos + arg
+    if major == 4 or major == 5:
+        for _ in range(arg if major == 4 else 2 * arg):
+            pos = _cbor_skip(buf, pos)
+    elif major == 6:
+        pos = _cbor_skip(buf, pos)
+    return pos
+
+
+def _cbor_value(buf, pos):
+    # Minimal DAG-CBOR decoder: byte strings and CIDs come back as views into buf, not copies
+    major, arg, pos = _cbor_head(buf, pos)
+    if major == 3:
+        return str(buf[pos:pos + arg], 'utf-8'), pos + arg
+    if major == 0:
+        return arg, pos
+    if major == 5:
+        result = {}
+        for _ in range(arg):
+            key, pos = _cbor_value(buf, pos)
+            result[key], pos = _cbor_value(buf, pos)
+        return result, pos
+    if major == 4:
+        result = []
+        for _ in range(arg):
+            item, pos = _cbor_value(buf, pos)
+            result.append(item)
+        return result, pos
+    if major == 2:
+        return buf[pos:pos + arg], pos + arg
+    if major == 6:
+        item, pos = _cbor_value(buf, pos)
+        # Tag 42 is a CID with a leading multibase 0x00 byte
+        return (item[1:] if arg == 42 else item), pos
+    if major == 1:
+        return -1 - arg, pos
+    return {20: False, 21: True, 22: None}.get(arg), pos
+
+
+def _read_uvarint(buf, pos):
+    result = shift = 0
+    while True:
+        byte = buf[pos]
+        pos += 1
+        result |= (byte & 0x7f) << shift
+        if byte < 0x80:
+            return result, pos
+        shift += 7
+
+
+def cid_to_str(cid):
+    return 'b' + base64.b32encode(bytes(cid)).decode().lower().rstrip('=')
+
+
+FirehoseRecord = namedtuple('FirehoseRecord', ['repo', 'collection', 'rkey', 'cid', 'block'])
+
+# Canonical DAG-CBOR for the {'t': '#commit', 'op': 1} frame header
+COMMIT_FRAME_HEADER = b'\xa2at' + b'g#commit' + b'bop\x01'
+
+
+def decode_commit(frame, collections=FIREHOSE_COLLECTIONS):
+    # Only walks as far as needed: the ops come first in canonical key order, so frames with no
+    # create in a wanted collection stop there, and CAR blocks are skipped by length until the
+    # wanted CIDs are found. Records come back as undecoded views into the frame.
+    buf = memoryview(frame)
+    if frame.startswith(COMMIT_FRAME_HEADER):
+        pos = len(COMMIT_FRAME_HEADER)
+    else:
+        header, pos = _cbor_value(buf, 0)
+        if header.get('t') != '#commit':
+            return []
+    _, fields, pos = _cbor_head(buf, pos)
+    wanted = {}
+    repo = blocks = None
+    for _ in range(fields):
+        _, size, pos = _cbor_head(buf, pos)
+        key = buf[pos:pos + size]
+        pos += size
+        if key == b'ops':
+            ops, pos = _cbor_value(buf, pos)
+            for op in ops:
+                if op['action'] == 'create' and op.get('cid') is not None:
+                    collection, _, rkey = op['path'].partition('/')
+                    if collection in collections:
+                        wanted[op['cid']] = (collection, rkey)
+            if not wanted:
+                return []
+        elif key == b'repo':
+            repo, pos = _cbor_value(buf, pos)
+        elif key == b'blocks':
+            _, size, pos = _cbor_head(buf, pos)
+            blocks = buf[pos:pos + size]
+            pos += size
+        else:
+            pos = _cbor_skip(buf, pos)
+    if not wanted or not blocks:
+        return []
+
+    records = []
+    size, pos = _read_uvarint(blocks, 0)
+    pos += size
+    while pos < len(blocks) and wanted:
+        size, pos = _read_uvarint(blocks, pos)
+        block_end = pos + size
+        # CIDv1: version and codec varints, then the multihash code and digest length
+        cid_end = pos + 1
+        while blocks[cid_end] & 0x80:
+            cid_end += 1
+        cid_end += 2
+        cid_end += 1 + blocks[cid_end]
+        # Read-only memoryviews hash like bytes, so the lookup needs no copy
+        target = wanted.pop(blocks[pos:cid_end], None)
+        if target:
+            records.append(FirehoseRecord(repo, target[0], target[1], blocks[pos:cid_end], blocks[cid_end:block_end]))
+        pos = block_end
+    return records
+
+
+class FirehoseConsumer(JetstreamConsumer):
+    def __init__(self, url=FIREHOSE_URL):
+        super().__init__(url)
+        self.seq = None
+        self.last_frame = None
+
+    async def handle_frame(self, frame):
+        self.events += 1
+        self.last_frame = frame
+        for record in decode_commit(frame, FIREHOSE_COLLECTIONS):
+            # Only the wanted record blocks are copied, and only prefilter hits get decoded
+            block = bytes(record.block)
+            uri = f'at://{record.repo}/{record.collection}/{record.rkey}'
+            if record.collection == 'app.bsky.graph.follow':
+                followed = [subscription for subscription in self.subscriptions if subscription.did.encode() in block]
+                if followed:
+                    value = _cbor_value(block, 0)[0]
+                    for subscription in followed:
+                        if value.get('subject') == subscription.did:
+                            self.matched += 1
+                            subscription.offer(StreamItem('follower', record.repo, uri, cid_to_str(record.cid), '', value))
+                continue
+            if not ((self.text_prefilter and self.text_prefilter.search(block.lower()))
+                    or any(marker in block for marker in self.did_markers)):
+                continue
+            value = _cbor_value(block, 0)[0]
+            text = value.get('text', '')
+            for subscription in self.subscriptions:
+                kind = subscription.classify(record.repo, text, value)
+                if kind:
+                    self.matched += 1
+                    subscription.offer(StreamItem(kind, record.repo, uri, cid_to_str(record.cid), text, value))
+
+    async def replay(self, path):
+        # Captured frames, each prefixed with its length as 4 big-endian bytes
+        with open(path, 'rb') as f:
+            while True:
+                prefix = f.read(4)
+                if len(prefix) < 4:
+                    break
+                await self.handle_frame(f.read(int.from_bytes(prefix, 'big')))
+
+    async def run(self):
+        while True:
+            url = self.url
+            if self.seq:
+                url += f'?cursor={max(0, self.seq - FIREHOSE_REWIND_SEQ)}'
+            try:
+                async with websocket_connect(url, max_size=None) as websocket:
+                    logging.info(f"Connected to firehose at {self.url}")
+                    async for message in websocket:
+                        await self.handle_frame(message)
+            except Exception as e:
+                logging.error(f"Firehose connection error: {str(e)}", exc_info=True)
+            # Only the last frame's sequence number is needed to resume, so it's decoded once per reconnect
+            if self.last_frame:
+                try:
+                    buf = memoryview(self.last_frame)
+                    pos = _cbor_skip(buf, 0)
+                    self.seq = _cbor_value(buf, pos)[0].get('seq', self.seq)
+                except (IndexError, ValueError, AttributeError):
+                    pass
+            await asyncio.sleep(JETSTREAM_RECONNECT_DELAY)
+
+
+Candidate = namedtuple('Candidate', ['did', 'handle'])
+Mention = namedtuple('Mention', ['uri', 'cid', 'did', 'handle', 'text', 'root_uri', 'root_cid'])
+
+
 class BlueskyBot:
     @retry(stop=stop_after_attempt(3), wait=wait_fixed(10))
+    def password_login(self):
+        self.client.login(self.handle, self.password)
+        logging.info(f"Successfully logged into Bluesky as {self.handle}")
+
     def login(self):
-        self.client.login(os.getenv('BLUESKY_HANDLE'), os.getenv('BLUESKY_PASSWORD'))
-        logging.info("Successfully logged into Bluesky")
+        session_string = self.load_session()
+        if session_string:
+            try:
+                self.client.login(session_string=session_string)
+                logging.info(f"Resumed stored Bluesky session for {self.handle}")
+                return
+            except Exception as e:
+                logging.warning(f"Stored session for {self.handle} is no longer valid, logging in with password: {str(e)}")
+        self.password_login()
+
+    def load_session(self):
+        row = self.db.query_one('SELECT session_string FROM sessions WHERE handle = ?', (self.handle,))
+        return row[0] if row else None
+
+    def save_session(self, event, session):
+        # Imported sessions are already stored, only persist newly created or refreshed tokens
+        if event not in (SessionEvent.CREATE, SessionEvent.REFRESH):
+            return
+        self.db.write('INSERT OR REPLACE INTO sessions (handle, session_string, updated_at) VALUES (?, ?, ?)',
+                      (self.handle, session.encode(), clock.now()))
+
+    def refresh_session(self):
+        session = Session.decode(self.client.export_session_string())
+        expires_at = datetime.fromtimestamp(session.access_jwt_payload.exp)
+        if expires_at - clock.now() > timedelta(seconds=SESSION_REFRESH_MARGIN):
+            return
+        try:
+            # Same lock the SDK takes before its own lazy refresh
+            with self.client._refresh_lock:
+                self.client._refresh_and_set_session()
+            logging.info(f"Refreshed Bluesky session for {self.handle}")
+        except Exception as e:
+            logging.warning(f"Session refresh failed for {self.handle}, logging in with password: {str(e)}")
+            self.password_login()
+
+    def __init__(self, handle=None, password=None, db_path=DB_PATH, daily_follow_limit=DAILY_FOLLOW_LIMIT,
+                 criteria=None, executor=None, http_client=None):
+        self.handle = handle or os.getenv('BLUESKY_HANDLE')
+        self.password = password or os.getenv('BLUESKY_PASSWORD')
+        self.db_path = db_path
+        self.daily_follow_limit = daily_follow_limit
+        self.criteria = CriteriaMatcher(**{**FOLLOW_CRITERIA, **(criteria or {})})
+        self.post_calendar = PostCalendar(seed=self.handle)
+        self.follow_pacer = FollowPacer(daily_follow_limit)
+        self.candidates = deque()
+        self.stream = None
+        self.next_post_slot = None
+        self.drafts_needed = asyncio.Event()
+        self.mention_dids = {}
+        self.mentions = asyncio.Queue(maxsize=REPLY_QUEUE_SIZE)
+        self.pending_mentions = set()
+        # Each account gets its own buckets, the server rate-limits per account
+        self.rate_limiter = RateLimiter()
+        self.client = Client(base_url=PDS_URL, request=RateLimitedRequest(self.rate_limiter, http_client))
+        # Client and DB calls block, so they run one at a time per bot on a worker thread
+        self._owns_executor = executor is None
+        self.executor = executor or ThreadPoolExecutor(max_workers=1, thread_name_prefix='bluesky-bot')
+        self._call_lock = asyncio.Lock()
+        self.client.on_session_change(self.save_session)
+        self._working_since = {}
+        metrics.gauge('bluesky_queue_depth', lambda: len(self.candidates), account=self.handle, queue='candidates')
+        metrics.gauge('bluesky_queue_depth', self.mentions.qsize, account=self.handle, queue='mentions')
+        log_context = log_account.set(self.handle)
+        try:
+            self.connect_db()
+            metrics.gauge('bluesky_queue_depth', lambda: self.db.pending, account=self.handle, queue='db_writes')
+            self.profiles = ProfileCache(self.db, self.fetch_profiles)
+            self.conversations = ConversationStore(self.db)
+            self.login()
+        finally:
+            log_account.reset(log_context)
 
-    def __init__(self):
-        self.client = Client()
-        self.connect_db()
-        self.login()
+    async def call(self, func, *args, **kwargs):
+        loop = asyncio.get_running_loop()
+        async with self._call_lock:
+            # Carry the account's log context onto the worker thread
+            context = contextvars.copy_context()
+            return await loop.run_in_executor(self.executor, context.run, functools.partial(func, *args, **kwargs))
+
+    async def idle(self, loop, awaitable):
+        # Time between idles counts as working, time inside one as sleeping
+        start = clock.monotonic()
+        if loop in self._working_since:
+            metrics.inc('bluesky_loop_seconds_total', start - self._working_since[loop],
+                        account=self.handle, loop=loop, state='working')
+        try:
+            return await awaitable
+        finally:
+            self._working_since[loop] = clock.monotonic()
+            metrics.inc('bluesky_loop_seconds_total', self._working_since[loop] - start,
+                        account=self.handle, loop=loop, state='sleeping')
 
     def connect_db(self):
         try:
-            self.conn = sqlite3.connect('bluesky_follows.db')
-            self.cursor = self.conn.cursor()
-            self.cursor.execute('''
-                CREATE TABLE IF NOT EXISTS followed_users (
-                    did TEXT PRIMARY KEY,
-                    handle TEXT,
-                    followed_at TIMESTAMP,
-                    unfollowed BOOLEAN DEFAULT 0
-                )
-            ''')
-            self.conn.commit()
+            self.db = FollowStore(self.db_path)
             logging.info("Database initialized successfully")
         except Exception as e:
             logging.error(f"Database initialization failed: {str(e)}")
             raise
 
     @retry(stop=stop_after_attempt(3), wait=wait_exponential(multiplier=1))
-    def get_suggestions(self):
+    def get_suggestions(self, cursor=None):
         try:
-            response = self.client.get_actor_suggestions()
-            return response.actors
-        except exceptions.RateLimitError:
+            response = self.client.app.bsky.actor.get_suggestions(
+                params={'limit': CANDIDATE_PAGE_SIZE, 'cursor': cursor})
+            return response.actors, response.cursor
+        except exceptions.RateLimitExceededError:
             logging.warning("Rate limit hit on get_suggestions")
             raise
         except Exception as e:
@@ -185,110 +1809,632 @@ class BlueskyBot:
             raise
 
     def check_criteria(self, user):
-        try:
-            if not any(term in user.handle.lower() for term in REQUIRED_TERMS):
-                return False
+        return bool(self.filter_candidates([user]))
+
+    def fetch_profiles(self, dids):
+        return self.client.get_profiles(dids).profiles
 
-            self.cursor.execute('SELECT did FROM followed_users WHERE did = ? AND unfollowed = 0', (user.did,))
-            return self.cursor.fetchone() is None
+    def filter_candidates(self, users):
+        try:
+            # Cheapest checks first: in-memory dedup, then the text rules, then profile counts
+            fresh = set(self.db.filter_not_followed([user.did for user in users if not self.db.is_follower(user.did)]))
+            matching = self.criteria.filter(user for user in users if user.did in fresh)
+            if self.criteria.needs_profiles and matching:
+                profiles = self.profiles.get_many([user.did for user in matching])
+                matching = [user for user in matching
+                            if user.did in profiles and self.criteria.accepts_profile(profiles[user.did])]
+            return matching
         except Exception as e:
             logging.error(f"Error checking criteria: {str(e)}", exc_info=True)
-            return False
+            return []
 
     @retry(stop=stop_after_attempt(2), wait=wait_exponential(multiplier=1))
     def follow_user(self, user):
         try:
-            self.client.follow(user.did)
-            self.cursor.execute('INSERT INTO followed_users (did, handle, followed_at) VALUES (?, ?, ?)',
-                                (user.did, user.handle, datetime.now()))
-            self.conn.commit()
+            response = self.client.follow(user.did)
+            self.db.record_follow(user.did, user.handle, clock.now(), response.uri)
+            metrics.inc('bluesky_follows_total', account=self.handle)
             logging.info(f"Successfully followed {user.handle}")
             return True
-        except exceptions.RateLimitError:
+        except exceptions.RateLimitExceededError:
             logging.warning(f"Rate limit hit following {user.handle}")
             raise
         except Exception as e:
             logging.error(f"Error following {user.handle}: {str(e)}", exc_info=True)
             return False
 
-    def daily_post(self):
-        system_prompt = SYSTEM_PROMPT 
-        user_prompt = "Create a post."
-        
-        post_text = get_assistant_response(user_prompt, system_prompt)
-        
-        if post_text:
+    def sync_followers(self, full=False):
+        # Followers come newest first, so an incremental sync stops at the first page holding a known follower
+        cursor = None
+        seen = []
+        new_count = 0
+        while True:
+            response = self.client.get_followers(self.client.me.did, cursor=cursor, limit=100)
+            dids = [follower.did for follower in response.followers]
+            seen.extend(dids)
+            new = self.db.add_followers(dids, clock.now())
+            new_count += len(new)
+            cursor = response.cursor
+            if not cursor or (not full and len(new) < len(dids)):
+                break
+
+        # Only a full pass sees every follower, so only then can missing ones be dropped
+        gone = self.db.prune_followers(seen) if full else set()
+        logging.info(f"Follower sync ({'full' if full else 'incremental'}): {new_count} new, {len(gone)} lost")
+        return new_count
+
+    def check_unfollows(self):
+        cutoff = clock.now() - timedelta(days=UNFOLLOW_AFTER_DAYS)
+        unfollowed = 0
+        for rows in self.db.iter_due_unfollows(cutoff, UNFOLLOW_BATCH_SIZE):
+            # Keep users who followed back, they are re-checked on later sweeps in case they stop
+            rows = [row for row in rows if not self.db.is_follower(row[0])]
+            if rows:
+                unfollowed += self.delete_follows(rows)
+        if unfollowed:
+            logging.info(f"Unfollowed {unfollowed} users followed more than {UNFOLLOW_AFTER_DAYS} days ago")
+        return unfollowed
+
+    def lookup_follow_uri(self, did):
+        # Only needed for rows stored before follow URIs were recorded
+        return self.client.get_profile(did).viewer.following
+
+    @retry(stop=stop_after_attempt(2), wait=wait_exponential(multiplier=1))
+    def delete_follows(self, rows):
+        try:
+            follow_uris = {}
+            for did, handle, follow_uri, _ in rows:
+                if not follow_uri:
+                    try:
+                        follow_uri = self.lookup_follow_uri(did)
+                    except exceptions.BadRequestError as e:
+                        # Deleted or suspended accounts have no profile, and no follow left to remove
+                        logging.warning(f"Could not look up follow of {handle}, marking unfollowed: {str(e)}")
+                    except exceptions.RateLimitExceededError:
+                        raise
+                    except Exception as e:
+                        logging.warning(f"Could not look up follow of {handle}, retrying next sweep: {str(e)}")
+                        continue
+                if follow_uri:
+                    follow_uris[did] = follow_uri
+                else:
+                    self.db.mark_unfollowed(did)
+
+            # One applyWrites call deletes the whole page of follow records
+            deleted = 0
+            if follow_uris:
+                try:
+                    self.client.com.atproto.repo.apply_writes(models.ComAtprotoRepoApplyWrites.Data(
+                        repo=self.client.me.did,
+                        writes=[models.ComAtprotoRepoApplyWrites.Delete(
+                            collection=models.ids.AppBskyGraphFollow, rkey=AtUri.from_str(uri).rkey)
+                            for uri in follow_uris.values()]))
+                    for did in follow_uris:
+                        self.db.mark_unfollowed(did)
+                    deleted = len(follow_uris)
+                except exceptions.RateLimitExceededError:
+                    raise
+                except Exception as e:
+                    # One bad record fails the whole batch, fall back to deleting them one at a time
+                    logging.warning(f"Batch unfollow of {len(follow_uris)} users failed, deleting one by one: {str(e)}")
+                    deleted = self.delete_follows_one_by_one(follow_uris)
+
+            metrics.inc('bluesky_unfollows_total', deleted, account=self.handle)
+            return deleted
+        except exceptions.RateLimitExceededError:
+            logging.warning(f"Rate limit hit unfollowing {len(rows)} users")
+            raise
+
+    def delete_follows_one_by_one(self, follow_uris):
+        deleted = 0
+        for did, follow_uri in follow_uris.items():
             try:
-                self.post_to_bluesky(post_text)
+                self.client.delete_follow(follow_uri)
+            except exceptions.RateLimitExceededError:
+                raise
             except Exception as e:
-                logging.error(f"Failed to post: {str(e)}", exc_info=True)
+                logging.warning(f"Could not delete follow record {follow_uri}, retrying next sweep: {str(e)}")
+                continue
+            self.db.mark_unfollowed(did)
+            deleted += 1
+        return deleted
+
+    def schedule_next_post(self):
+        now = clock.now(utc)
+        # Slots missed by more than the grace period (e.g. while the bot was down) are skipped, not replayed
+        after = now - timedelta(seconds=POST_MISSED_GRACE)
+        last_slot = self.db.last_post_slot()
+        if last_slot and last_slot > after:
+            after = last_slot
+        self.next_post_slot = self.post_calendar.next_slot(after)
+        wait_time = max((self.next_post_slot - now).total_seconds(), 0)
+        logging.info(f"Next post at {self.next_post_slot.astimezone(POST_TIMEZONE)} ({wait_time/60:.0f} minutes)")
+        return wait_time
+
+    def resolve_mention(self, handle):
+        if handle not in self.mention_dids:
+            try:
+                self.mention_dids[handle] = self.client.resolve_handle(handle).did
+            except Exception as e:
+                logging.warning(f"Could not resolve mention @{handle}: {str(e)}")
+                self.mention_dids[handle] = None
+        return self.mention_dids[handle]
+
+    def build_facets(self, spans):
+        facets = []
+        for byte_start, byte_end, kind, value in spans:
+            if kind == 'link':
+                feature = models.AppBskyRichtextFacet.Link(uri=value)
+            elif kind == 'tag':
+                feature = models.AppBskyRichtextFacet.Tag(tag=value)
+            else:
+                did = self.resolve_mention(value)
+                if not did:
+                    continue
+                feature = models.AppBskyRichtextFacet.Mention(did=did)
+            facets.append(models.AppBskyRichtextFacet.Main(
+                index=models.AppBskyRichtextFacet.ByteSlice(byte_start=byte_start, byte_end=byte_end),
+                features=[feature]))
+        return facets
+
+    def post_to_bluesky(self, text, reply_to=None):
+        # Anything over the grapheme limit goes out as a thread, each part replying to the previous one
+        chunks = split_post(text)
+        root, parent = (reply_to.root, reply_to.parent) if reply_to else (None, None)
+        first = None
+        for index, (chunk, spans) in enumerate(chunks):
+            reply_ref = models.AppBskyFeedPost.ReplyRef(root=root, parent=parent) if parent else None
+            try:
+                response = self.client.send_post(text=chunk, facets=self.build_facets(spans) or None, reply_to=reply_ref)
+            except Exception as e:
+                if first is None:
+                    raise
+                # Earlier parts are already public, retrying the text would post it again from the start
+                logging.error(f"Thread {first.uri} stopped after {index} of {len(chunks)} parts: {str(e)}", exc_info=True)
+                return first.uri
+            parent = models.create_strong_ref(response)
+            root = root or parent
+            first = first or parent
+        logging.info(f"Posted {first.uri} ({len(chunks)} part{'s' if len(chunks) > 1 else ''})")
+        return first.uri
+
+    async def generate_draft(self):
+        # Generation only waits on the LLM, keep it off the bot's worker so follows keep going
+        post_text = await llm_client.run(get_assistant_response, SYSTEM_PROMPT, "Create a post.",
+                                         context='posts', conversations=self.conversations)
+        return clean_draft(post_text)
+
+    async def refill_drafts(self):
+        missing = POST_DRAFT_BUFFER - await self.call(self.db.count_drafts)
+        if missing <= 0:
+            return 0
+        drafts = await asyncio.gather(*(self.generate_draft() for _ in range(missing)))
+        added = 0
+        for draft in drafts:
+            if draft:
+                added += await self.call(self.db.add_draft, draft)
+        logging.info(f"Generated {added} of {missing} missing post drafts")
+        return added
+
+    async def draft_generator_loop(self):
+        while True:
+            try:
+                await self.refill_drafts()
+            except Exception as e:
+                logging.error(f"Draft generation error: {str(e)}", exc_info=True)
+            # Refill right after a draft is used, otherwise top up periodically
+            try:
+                await self.idle('drafts', asyncio.wait_for(self.drafts_needed.wait(), POST_DRAFT_CHECK_INTERVAL))
+            except asyncio.TimeoutError:
+                pass
+            self.drafts_needed.clear()
+
+    async def daily_post(self):
+        draft = await self.call(self.db.next_draft)
+        if draft:
+            draft_id, post_text = draft
         else:
-            logging.warning("AI generation failed, retrying in 1 hour")
-            time.sleep(3600)
+            logging.warning("No pre-generated drafts available, generating at post time")
+            draft_id, post_text = None, await self.generate_draft()
+
+        if not post_text:
+            logging.warning("AI generation failed, skipping this post slot")
+            return None
 
-    def follow_cycle(self):
-        follow_count = 0
-        start_time = datetime.now()
+        try:
+            uri = await self.call(self.post_to_bluesky, post_text)
+            if draft_id is not None:
+                await self.call(self.db.delete_draft, draft_id)
+            return uri
+        except Exception as e:
+            logging.error(f"Failed to post: {str(e)}", exc_info=True)
+            if draft_id is not None:
+                await self.call(self.db.fail_draft, draft_id, POST_DRAFT_MAX_ATTEMPTS)
+            return None
+        finally:
+            self.drafts_needed.set()
 
+    async def post_loop(self):
         while True:
             try:
-                self.check_unfollows()
+                wait_time = await self.call(self.schedule_next_post)
+                await self.idle('post', asyncio.sleep(wait_time))
+                slot = self.next_post_slot
+                uri = await self.daily_post()
+                # The slot is spent whether or not the post went out, so failures wait for the next one
+                await self.call(self.db.record_post_slot, slot, uri)
+            except Exception as e:
+                logging.error(f"Post loop error: {str(e)}", exc_info=True)
+                await self.idle('post', asyncio.sleep(300))
 
-                if follow_count < DAILY_FOLLOW_LIMIT:
-                    suggestions = self.get_suggestions()
-                    if not suggestions:
-                        logging.warning("No follow suggestions available. Sleeping for 1 hour.")
-                        time.sleep(3600)
-                        continue
+    def fetch_mentions(self, since):
+        # Notifications come newest first, page back until the stored watermark
+        mentions = []
+        newest = None
+        cursor = None
+        while True:
+            response = self.client.app.bsky.notification.list_notifications(
+                params={'limit': REPLY_PAGE_SIZE, 'reasons': ['mention'], 'cursor': cursor})
+            done = not response.cursor
+            for notification in response.notifications:
+                newest = newest or notification.indexed_at
+                if since and notification.indexed_at <= since:
+                    done = True
+                    break
+                if notification.reason != 'mention' or notification.author.did == self.client.me.did:
+                    continue
+                record = notification.record
+                reply = getattr(record, 'reply', None)
+                mentions.append(Mention(notification.uri, notification.cid, notification.author.did,
+                                        notification.author.handle, getattr(record, 'text', ''),
+                                        reply.root.uri if reply else notification.uri,
+                                        reply.root.cid if reply else notification.cid))
+            # Without a watermark only the newest page is read, older mentions are not answered
+            if done or not since:
+                break
+            cursor = response.cursor
+        mentions.reverse()
+        return mentions, newest or since
 
-                    random.shuffle(suggestions)
+    async def enqueue_mention(self, mention):
+        if mention.uri in self.pending_mentions or mention.did == self.client.me.did:
+            return False
+        if await self.call(self.db.has_replied, mention.uri):
+            return False
+        self.pending_mentions.add(mention.uri)
+        # Bounded: a burst of mentions waits here instead of piling up in memory
+        await self.mentions.put(mention)
+        return True
 
-                    for user in suggestions:
-                        if self.check_criteria(user):
-                            if self.follow_user(user):
-                                follow_count += 1
-                                delay = random.randint(FOLLOW_DELAY_MIN, FOLLOW_DELAY_MAX)
-                                logging.info(f"Sleeping for {delay//60} minutes")
-                                time.sleep(delay)
+    async def answer_mention(self, mention):
+        name = f'@{mention.handle}' if mention.handle else mention.did
+        # Each thread keeps its own history, so later replies in it follow on from earlier ones
+        reply_text = clean_draft(await llm_client.run(
+            get_assistant_response, REPLY_SYSTEM_PROMPT, f"{name} wrote: {mention.text}",
+            context=f'thread:{mention.root_uri}', conversations=self.conversations))
+        if not reply_text:
+            logging.warning(f"AI generation failed, not replying to {mention.uri}")
+            await self.call(self.db.record_reply, mention.uri, None, clock.now(utc).isoformat())
+            return None
+        reply_to = models.AppBskyFeedPost.ReplyRef(
+            root=models.ComAtprotoRepoStrongRef.Main(uri=mention.root_uri, cid=mention.root_cid),
+            parent=models.ComAtprotoRepoStrongRef.Main(uri=mention.uri, cid=mention.cid))
+        uri = await self.call(self.post_to_bluesky, reply_text, reply_to)
+        await self.call(self.db.record_reply, mention.uri, uri, clock.now(utc).isoformat())
+        return uri
+
+    async def reply_worker(self):
+        # REPLY_CONCURRENCY of these run per bot; the LLM calls they make queue on llm_client's threads
+        while True:
+            mention = await self.mentions.get()
+            try:
+                await self.answer_mention(mention)
+            except Exception as e:
+                logging.error(f"Failed to reply to {mention.uri}: {str(e)}", exc_info=True)
+            finally:
+                self.pending_mentions.discard(mention.uri)
+                self.mentions.task_done()
+
+    async def mention_poll_loop(self):
+        since = await self.call(self.db.get_cursor, 'notifications')
+        while True:
+            try:
+                mentions, newest = await self.call(self.fetch_mentions, since)
+                if not since:
+                    logging.info(f"Answering mentions from {newest} on")
+                    mentions = []
+                for mention in mentions:
+                    await self.enqueue_mention(mention)
+                if newest != since:
+                    since = newest
+                    await self.call(self.db.set_cursor, 'notifications', newest)
+            except Exception as e:
+                logging.error(f"Mention polling error: {str(e)}", exc_info=True)
+            await self.idle('mentions', asyncio.sleep(REPLY_POLL_INTERVAL))
 
-                            if follow_count >= DAILY_FOLLOW_LIMIT:
-                                break
+    def fetch_search_page(self, term, cursor):
+        response = self.client.app.bsky.actor.search_actors(
+            params={'q': term, 'limit': CANDIDATE_PAGE_SIZE, 'cursor': cursor})
+        return response.actors, response.cursor
 
-                    if not suggestions:
-                        time.sleep(3600)
+    def fetch_follower_page(self, did, cursor):
+        response = self.client.get_followers(did, cursor=cursor, limit=CANDIDATE_PAGE_SIZE)
+        return response.followers, response.cursor
 
-                else:
-                    remaining = (start_time + timedelta(hours=24) - datetime.now()).total_seconds()
-                    logging.info(f"Daily follow limit reached. Sleeping for {remaining:.0f} seconds")
-                    time.sleep(remaining)
-                    follow_count = 0
-                    start_time = datetime.now()
+    def fetch_liker_page(self, uri, cursor):
+        response = self.client.get_likes(uri, cursor=cursor, limit=CANDIDATE_PAGE_SIZE)
+        return [like.actor for like in response.likes], response.cursor
+
+    def candidate_sources(self):
+        # (cursor key, source name, page fetcher); every source resumes from its stored cursor
+        sources = [('suggestions', 'suggestions', self.get_suggestions)]
+        sources += [(f'search:{term}', 'search', functools.partial(self.fetch_search_page, term))
+                    for term in self.criteria.include_terms]
+        follower = self.db.random_follower()
+        if follower:
+            sources.append((f'followers_of_followers:{follower}', 'followers_of_followers',
+                            functools.partial(self.fetch_follower_page, follower)))
+        sources += [(f'likers:{uri}', 'likers', functools.partial(self.fetch_liker_page, uri))
+                    for uri in self.db.recent_post_uris(CANDIDATE_LIKED_POSTS)]
+        return sources
+
+    def discover_candidates(self):
+        added = 0
+        for key, source, fetch in self.candidate_sources():
+            try:
+                actors, cursor = fetch(self.db.get_cursor(key))
+            except exceptions.RateLimitExceededError:
+                logging.warning(f"Rate limit hit discovering candidates from {key}")
+                break
+            except Exception as e:
+                logging.error(f"Error discovering candidates from {key}: {str(e)}", exc_info=True)
+                continue
+            # An exhausted cursor is stored as None, so the source starts over next time
+            self.db.set_cursor(key, cursor)
+            eligible = [user for user in self.filter_candidates(actors) if user.did != self.client.me.did]
+            added += self.db.add_candidates(eligible, source, CANDIDATE_SOURCE_WEIGHTS[source])
+        logging.info(f"Discovered {added} eligible candidates")
+        return added
+
+    async def next_candidate(self):
+        discovered = False
+        while True:
+            while self.candidates:
+                user = self.candidates.popleft()
+                # Candidates can be followed, or follow us, while they wait in the queue
+                if not self.db.is_followed(user.did) and not self.db.is_follower(user.did):
+                    return user
+            rows = await self.call(self.db.pop_candidates, CANDIDATE_BATCH_SIZE)
+            if rows:
+                self.candidates.extend(Candidate(did, handle) for did, handle in rows)
+            elif discovered or not await self.call(self.discover_candidates):
+                return None
+            else:
+                discovered = True
+
+    def add_stream_candidates(self, dids):
+        profiles = self.profiles.get_many(dids)
+        eligible = [user for user in self.filter_candidates(profiles.values()) if user.did != self.client.me.did]
+        return self.db.add_candidates(eligible, 'stream', CANDIDATE_SOURCE_WEIGHTS['stream'])
+
+    async def stream_loop(self):
+        while True:
+            item = await self.idle('stream', self.stream.queue.get())
+            # Drain whatever else is waiting so profile lookups go out in full getProfiles batches
+            items = [item]
+            while not self.stream.queue.empty() and len(items) < JETSTREAM_BATCH_SIZE:
+                items.append(self.stream.queue.get_nowait())
+            try:
+                for item in (item for item in items if item.kind == 'mention'):
+                    if REPLY_ENABLED:
+                        root = (item.record.get('reply') or {}).get('root') or {}
+                        await self.enqueue_mention(Mention(item.uri, item.cid, item.did, None, item.text,
+                                                           root.get('uri', item.uri), root.get('cid', item.cid)))
+                    else:
+                        logging.info(f"Mentioned by {item.did} in {item.uri}")
+                followers = [item.did for item in items if item.kind == 'follower']
+                if followers:
+                    await self.call(self.db.add_followers, followers, clock.now())
+                dids = list(dict.fromkeys(item.did for item in items if item.kind == 'candidate'))
+                if dids:
+                    await self.call(self.add_stream_candidates, dids)
+            except Exception as e:
+                logging.error(f"Stream processing error: {str(e)}", exc_info=True)
+
+    async def discovery_loop(self):
+        while True:
+            try:
+                if await self.call(self.db.count_queued_candidates) < CANDIDATE_QUEUE_TARGET:
+                    await self.call(self.discover_candidates)
+                await self.call(self.db.prune_profiles, clock.time() - self.profiles.ttl)
+                await self.call(self.db.prune_conversations, clock.time() - CONVERSATION_TTL)
+            except Exception as e:
+                logging.error(f"Candidate discovery error: {str(e)}", exc_info=True)
+            await self.idle('discovery', asyncio.sleep(CANDIDATE_DISCOVERY_INTERVAL))
+
+    async def follow_cycle(self):
+        now = clock.now(utc)
+        window_start, _ = self.follow_pacer.window(now)
+        if window_start <= now:
+            # Follows already made in today's window still count against the budget after a restart
+            count = await self.call(self.db.count_follows_since, window_start.astimezone().replace(tzinfo=None))
+            self.follow_pacer.start_window(window_start, count)
+
+        while True:
+            try:
+                delay = self.follow_pacer.next_delay(clock.now(utc))
+                if delay > 0:
+                    logging.info(f"Next follow in {delay/60:.0f} minutes "
+                                 f"({self.follow_pacer.count}/{self.daily_follow_limit} today)")
+                    await self.idle('follow', asyncio.sleep(delay))
+
+                user = await self.next_candidate()
+                if user is None:
+                    logging.info("No eligible candidates from any source. Sleeping for 1 hour.")
+                    await self.idle('follow', asyncio.sleep(3600))
+                    continue
+
+                if await self.call(self.follow_user, user):
+                    self.follow_pacer.record_follow(clock.now(utc))
             except Exception as e:
                 logging.error(f"Follow cycle error: {str(e)}", exc_info=True)
-                time.sleep(300)
+                await self.idle('follow', asyncio.sleep(300))
+
+    async def follower_sync_loop(self):
+        last_full_sync = None
+        while True:
+            try:
+                full = last_full_sync is None or clock.now() - last_full_sync >= timedelta(seconds=FOLLOWER_FULL_SYNC_INTERVAL)
+                await self.call(self.sync_followers, full)
+                if full:
+                    last_full_sync = clock.now()
+            except Exception as e:
+                logging.error(f"Follower sync error: {str(e)}", exc_info=True)
+            await self.idle('follower_sync', asyncio.sleep(FOLLOWER_SYNC_INTERVAL))
+
+    async def unfollow_loop(self):
+        while True:
+            try:
+                await self.call(self.check_unfollows)
+            except Exception as e:
+                logging.error(f"Unfollow check error: {str(e)}", exc_info=True)
+            await self.idle('unfollow', asyncio.sleep(UNFOLLOW_CHECK_INTERVAL))
+
+    async def session_refresh_loop(self):
+        while True:
+            await self.idle('session_refresh', asyncio.sleep(SESSION_REFRESH_INTERVAL))
+            try:
+                await self.call(self.refresh_session)
+            except Exception as e:
+                logging.error(f"Session refresh error: {str(e)}", exc_info=True)
+
+    async def db_flush_loop(self):
+        while True:
+            await self.idle('db_flush', asyncio.sleep(self.db.flush_interval))
+            # Most ticks have nothing queued, which needs no trip to the worker thread
+            if not self.db.pending:
+                continue
+            try:
+                await self.call(self.db.flush)
+            except Exception as e:
+                logging.error(f"Database flush error: {str(e)}", exc_info=True)
+
+    def subscribe_stream(self, consumer):
+        self.stream = consumer.subscribe(self.client.me.did, self.handle, self.criteria.include_terms)
+        metrics.gauge('bluesky_queue_depth', self.stream.queue.qsize, account=self.handle, queue='stream')
+
+    async def main(self):
+        # Tasks copy the current context, so every loop below logs under this account
+        log_account.set(self.handle)
+        # Each job is its own task, so a long sleep in one never holds up the others
+        await asyncio.gather(
+            *([self.stream_loop()] if self.stream else []),
+            self.session_refresh_loop(),
+            self.db_flush_loop(),
+            self.follower_sync_loop(),
+            self.discovery_loop(),
+            self.draft_generator_loop(),
+            self.post_loop(),
+            *([self.mention_poll_loop(), *(self.reply_worker() for _ in range(REPLY_CONCURRENCY))]
+              if REPLY_ENABLED else []),
+            self.follow_cycle(),
+            self.unfollow_loop(),
+        )
+
+    def close(self):
+        if self._owns_executor:
+            self.executor.shutdown(wait=True)
+        self.db.close()
 
     def run(self):
         try:
-            while True:
-                wait_time = self.schedule_next_post()
-                time.sleep(wait_time)
-                self.daily_post()
-                
-                follow_thread = threading.Thread(target=self.follow_cycle, daemon=True)
-                follow_thread.start()
-                follow_thread.join()
+            clock.run(self.main())
+        except KeyboardInterrupt:
+            logging.info("Shutting down...")
+        finally:
+            flushed = self.db.flush()
+            logging.info(f"Flushed {flushed} pending database writes")
+            self.close()
+
+
+def load_accounts(path=ACCOUNTS_FILE):
+    # Accounts file is a JSON list of {"handle", "password" or "password_env", "daily_follow_limit", "db_path", "criteria"}
+    if not os.path.exists(path):
+        handle, password = os.getenv('BLUESKY_HANDLE'), os.getenv('BLUESKY_PASSWORD')
+        if not handle or not password:
+            return []
+        return [{'handle': handle, 'password': password, 'db_path': DB_PATH}]
+
+    with open(path) as f:
+        entries = json.load(f)
+
+    accounts = []
+    for entry in entries:
+        account = dict(entry)
+        if 'password_env' in account:
+            account['password'] = os.getenv(account.pop('password_env'))
+        if not account.get('handle') or not account.get('password'):
+            logging.error(f"Skipping account without handle or password: {account.get('handle')}")
+            continue
+        account.setdefault('db_path', f"bluesky_follows_{account['handle']}.db")
+        accounts.append(account)
+    return accounts
+
 
+class BotOrchestrator:
+    def __init__(self, accounts, max_workers=None):
+        # One HTTP pool and one worker pool shared by every account
+        self.http_client = httpx.Client(follow_redirects=True)
+        self.executor = ThreadPoolExecutor(max_workers=max_workers or min(32, len(accounts) + 4),
+                                           thread_name_prefix='bluesky-bot')
+        self.bots = []
+        for account in accounts:
+            try:
+                self.bots.append(BlueskyBot(executor=self.executor, http_client=self.http_client, **account))
+            except Exception as e:
+                logging.error(f"Failed to start bot for {account['handle']}: {str(e)}", exc_info=True)
+
+        # One stream connection feeds every account
+        self.stream = None
+        if self.bots and FIREHOSE_ENABLED:
+            self.stream = FirehoseConsumer()
+        elif self.bots and JETSTREAM_ENABLED:
+            self.stream = JetstreamConsumer()
+        for bot in self.bots:
+            if self.stream:
+                bot.subscribe_stream(self.stream)
+
+        self.metrics_server = start_metrics_server() if METRICS_PORT else None
+
+    async def main(self):
+        await asyncio.gather(
+            *([self.stream.run()] if self.stream else []),
+            *(bot.main() for bot in self.bots),
+        )
+
+    def close(self):
+        if self.metrics_server:
+            self.metrics_server.shutdown()
+            self.metrics_server.server_close()
+        for bot in self.bots:
+            bot.close()
+        self.executor.shutdown(wait=True)
+        self.http_client.close()
+        llm_client.close()
+
+    def run(self):
+        try:
+            clock.run(self.main())
         except KeyboardInterrupt:
             logging.info("Shutting down...")
         finally:
-            self.conn.close()
+            self.close()
 
 if __name__ == "__main__":
-    required_vars = ['BLUESKY_HANDLE', 'BLUESKY_PASSWORD']
-    missing = [var for var in required_vars if not os.getenv(var)]
-    
-    if missing:
-        logging.error(f"Missing environment variables: {', '.join(missing)}")
+    accounts = load_accounts()
+
+    if not accounts:
+        logging.error(f"No accounts configured: set BLUESKY_HANDLE and BLUESKY_PASSWORD or provide {ACCOUNTS_FILE}")
     else:
-        bot = BlueskyBot()
-        bot.run()
+        orchestrator = BotOrchestrator(accounts)
+        orchestrator.run()
@@ -0,0 +1,78 @@
+import argparse
+import asyncio
+import json
+import os
+import tempfile
+import time
+
+import fake_server
+import main
+
+
+def simulate(days=7.0, seed=0, follow_back_rate=0.2, mentions_per_hour=1.0, latency=0.0, llm_latency=0.0):
+    # Runs one bot against the fake PDS and LLM with both on a SimulatedClock, so every loop
+    # (posting slots, follow pacing, unfollow sweeps, mention replies) plays out in virtual time
+    clock = main.SimulatedClock()
+    main.clock = clock
+    server = fake_server.FakeServer(seed=seed, follow_back_rate=follow_back_rate, latency=latency,
+                                    llm_latency=llm_latency, mention_rate=mentions_per_hour / 3600,
+                                    clock=clock).start()
+    main.PDS_URL = server.url
+    main.llm_client = main.LLMClient(base_url=server.url)
+    # Replies are opt-in for real accounts, the simulation always exercises them
+    reply_enabled, main.REPLY_ENABLED = main.REPLY_ENABLED, True
+    try:
+        with tempfile.TemporaryDirectory() as tmp:
+            bot = main.BlueskyBot(fake_server.FAKE_HANDLE, 'simulate', db_path=os.path.join(tmp, 'simulate.db'))
+            start = time.perf_counter()
+            try:
+                clock.run(asyncio.wait_for(bot.main(), days * 86400))
+            except asyncio.TimeoutError:
+                pass
+            elapsed = time.perf_counter() - start
+            bot.db.flush()
+            db = bot.db
+            result = {
+                'simulated_days': clock.monotonic() / 86400,
+                'real_seconds': elapsed,
+                'speedup': clock.monotonic() / elapsed,
+                'follows': db.query_one('SELECT COUNT(*) FROM followed_users')[0],
+                'unfollows': db.query_one('SELECT COUNT(*) FROM followed_users WHERE unfollowed = 1')[0],
+                'followers': db.query_one('SELECT COUNT(*) FROM followers')[0],
+                'posts': db.query_one('SELECT COUNT(*) FROM post_slots WHERE uri IS NOT NULL')[0],
+                'missed_slots': db.query_one('SELECT COUNT(*) FROM post_slots WHERE uri IS NULL')[0],
+                'replies': db.query_one('SELECT COUNT(*) FROM replies WHERE reply_uri IS NOT NULL')[0],
+                'server': dict(server.backend.stats),
+            }
+            bot.close()
+    finally:
+        server.stop()
+        main.llm_client.close()
+        main.clock = main.Clock()
+        main.REPLY_ENABLED = reply_enabled
+    return result
+
+
+def main_cli():
+    parser = argparse.ArgumentParser(description='Replay days of bot operation in simulated time against local fakes')
+    parser.add_argument('--days', type=float, default=7.0, help='Simulated days to run')
+    parser.add_argument('--seed', type=int, default=0, help='Fake server seed')
+    parser.add_argument('--follow-back-rate', type=float, default=0.2)
+    parser.add_argument('--mentions-per-hour', type=float, default=1.0)
+    parser.add_argument('--latency', type=float, default=0.0, help='Simulated XRPC latency in seconds')
+    parser.add_argument('--llm-latency', type=float, default=0.0, help='Simulated LLM latency in seconds')
+    parser.add_argument('--output', help='JSON file to write the summary to')
+    args = parser.parse_args()
+
+    result = simulate(args.days, args.seed, args.follow_back_rate, args.mentions_per_hour, args.latency, args.llm_latency)
+    print(f"{result['simulated_days']:.1f} simulated days in {result['real_seconds']:.1f}s "
+          f"({result['speedup']:,.0f}x): {result['follows']} follows, {result['unfollows']} unfollows, "
+          f"{result['followers']} followers, {result['posts']} posts ({result['missed_slots']} slots missed), "
+          f"{result['replies']} replies")
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(result, f, indent=2)
+
+
+if __name__ == '__main__':
+    main_cli()
@@ -0,0 +1,5 @@
+import os
+import tempfile
+
+# Importing main configures file logging, keep test runs out of the working copy's log
+os.environ.setdefault('BLUESKY_LOG_FILE', os.path.join(tempfile.gettempdir(), 'bluesky_bot_tests.log'))
@@ -0,0 +1,86 @@
+import os
+import tempfile
+import unittest
+from types import SimpleNamespace
+from unittest import mock
+
+import main
+
+
+def user(handle, display_name=None, description=None):
+    return SimpleNamespace(did=f'did:plc:{handle}', handle=handle, display_name=display_name, description=description)
+
+
+def handles(users):
+    return [u.handle for u in users]
+
+
+class CriteriaMatcherTest(unittest.TestCase):
+    def assertPageMatchesSingles(self, matcher, users):
+        singles = [u for u in users if matcher.filter([u])]
+        self.assertEqual(handles(matcher.filter(users)), handles(singles))
+
+    def test_trie_matches_prefix_and_longer_terms(self):
+        matcher = main.CriteriaMatcher(include=['sky', 'skyline'])
+        users = [user('skyline.test'), user('sky.test'), user('sk.test'), user('blue.test')]
+        self.assertEqual(handles(matcher.filter(users)), ['skyline.test', 'sky.test'])
+
+    def test_terms_are_case_insensitive_and_escaped(self):
+        matcher = main.CriteriaMatcher(include=['a.b'])
+        self.assertEqual(handles(matcher.filter([user('A.B.test'), user('axb.test')])), ['A.B.test'])
+
+    def test_exclude_wins_over_include(self):
+        matcher = main.CriteriaMatcher(include=['sky'], exclude=['bot'])
+        users = [user('sky.test'), user('skybot.test'), user('bot.test')]
+        self.assertEqual(handles(matcher.filter(users)), ['sky.test'])
+
+    def test_no_include_rule_accepts_everything_not_excluded(self):
+        matcher = main.CriteriaMatcher(exclude=['spam'])
+        self.assertEqual(handles(matcher.filter([user('a.test'), user('spam.test')])), ['a.test'])
+
+    def test_any_configured_field_can_match(self):
+        matcher = main.CriteriaMatcher(include=['python'], exclude=['crypto'],
+                                       fields=['handle', 'displayName', 'description'])
+        users = [
+            user('a.test', description='I write Python'),
+            user('b.test', display_name='Python fan'),
+            user('python.test'),
+            user('c.test', description='python and crypto'),
+            user('d.test', description=None),
+        ]
+        self.assertEqual(handles(matcher.filter(users)), ['a.test', 'b.test', 'python.test'])
+
+    def test_anchored_patterns_match_every_user_on_the_page(self):
+        matcher = main.CriteriaMatcher(exclude_patterns=[r'^spam'])
+        users = [user('spam.bsky.social'), user('spammer.bsky.social'), user('ok.bsky.social')]
+        self.assertEqual(handles(matcher.filter(users)), ['ok.bsky.social'])
+        self.assertPageMatchesSingles(matcher, users)
+
+        matcher = main.CriteriaMatcher(include_patterns=[r'\.social$'])
+        users = [user('a.bsky.social'), user('b.example.com'), user('c.bsky.social')]
+        self.assertEqual(handles(matcher.filter(users)), ['a.bsky.social', 'c.bsky.social'])
+        self.assertPageMatchesSingles(matcher, users)
+
+    def test_patterns_never_match_across_users(self):
+        matcher = main.CriteriaMatcher(include_patterns=[r'end\s+start'], fields=['description'])
+        users = [user('a.test', description='the end'), user('b.test', description='start here'),
+                 user('c.test', description='end start')]
+        self.assertEqual(handles(matcher.filter(users)), ['c.test'])
+        self.assertPageMatchesSingles(matcher, users)
+
+
+class AccountCriteriaTest(unittest.TestCase):
+    def test_account_criteria_override_defaults_key_by_key(self):
+        with tempfile.TemporaryDirectory() as tmp, mock.patch.object(main.BlueskyBot, 'login'):
+            bot = main.BlueskyBot('me.test', 'secret', db_path=os.path.join(tmp, 'follows.db'),
+                                  criteria={'exclude': ['bot']})
+            try:
+                users = [user('sky.test'), user('other.test'), user('skybot.test')]
+                # include still comes from FOLLOW_CRITERIA
+                self.assertEqual(handles(bot.criteria.filter(users)), ['sky.test'])
+            finally:
+                bot.close()
+
+
+if __name__ == '__main__':
+    unittest.main()
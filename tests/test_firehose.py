@@ -0,0 +1,102 @@
+import hashlib
+import re
+import unittest
+
+import libipld
+
+import main
+
+REPO = 'did:plc:author'
+SUBSCRIBER = 'did:plc:me'
+
+
+def cid_for(block):
+    # CIDv1, dag-cbor, sha2-256
+    return b'\x01\x71\x12\x20' + hashlib.sha256(block).digest()
+
+
+def varint(value):
+    out = bytearray()
+    while value > 0x7f:
+        out.append(value & 0x7f | 0x80)
+        value >>= 7
+    out.append(value)
+    return bytes(out)
+
+
+def encode(value, cids):
+    # libipld writes bytes, not links, so CIDs go in as b'\0' + cid and get wrapped in tag 42 afterwards
+    # (links already tagged inside nested blocks are left alone)
+    encoded = libipld.encode_dag_cbor(value)
+    for cid in cids:
+        encoded = re.sub(rb'(?<!\xd8\x2a)\x58\x25\x00' + re.escape(cid), lambda match: b'\xd8\x2a' + match.group(0), encoded)
+    return encoded
+
+
+def link(cid):
+    return b'\x00' + cid
+
+
+def commit_frame(ops, records, header=None):
+    record_blocks = [(cid_for(block), block) for block in (libipld.encode_dag_cbor(record) for record in records)]
+    cids = [cid for cid, _ in record_blocks]
+    # MST nodes sit between the commit block and the records, and link to them
+    mst = [encode({'e': [{'k': b'key', 'p': 0, 't': None, 'v': link(cid)} for cid in cids], 'l': None}, cids)]
+    mst_blocks = [(cid_for(node), node) for node in mst]
+    commit = encode({'did': REPO, 'rev': '3k', 'sig': b'sig', 'data': link(mst_blocks[0][0]), 'prev': None,
+                     'version': 3}, [mst_blocks[0][0]])
+    commit_cid = cid_for(commit)
+    blocks = [(commit_cid, commit), *mst_blocks, *record_blocks]
+    car_header = encode({'roots': [link(commit_cid)], 'version': 1}, [commit_cid])
+    car = varint(len(car_header)) + car_header + b''.join(varint(len(cid) + len(block)) + cid + block
+                                                          for cid, block in blocks)
+    body_ops = [{'action': action, 'path': path, 'cid': link(cids[index]) if index is not None else None}
+                for action, path, index in ops]
+    body = encode({'ops': body_ops, 'rev': '3k', 'seq': 7, 'prev': None, 'repo': REPO, 'time': '2026-01-01T00:00:00Z',
+                   'blobs': [], 'since': None, 'blocks': car, 'commit': link(commit_cid), 'rebase': False,
+                   'tooBig': False}, [*cids, commit_cid])
+    return libipld.encode_dag_cbor(header or {'op': 1, 't': '#commit'}) + body, cids
+
+
+POST = {'$type': 'app.bsky.feed.post', 'text': 'hello #python', 'createdAt': '2026-01-01T00:00:00Z'}
+FOLLOW = {'$type': 'app.bsky.graph.follow', 'subject': SUBSCRIBER, 'createdAt': '2026-01-01T00:00:00Z'}
+LIKE = {'$type': 'app.bsky.feed.like', 'subject': {'uri': 'at://x/app.bsky.feed.post/1', 'cid': 'bafy'},
+        'createdAt': '2026-01-01T00:00:00Z'}
+
+
+class DecodeCommitTest(unittest.TestCase):
+    def test_frame_is_valid_dag_cbor(self):
+        frame, _ = commit_frame([('create', 'app.bsky.feed.post/1', 0)], [POST])
+        header, body = libipld.decode_dag_cbor_multi(frame)
+        self.assertEqual(header, {'op': 1, 't': '#commit'})
+        self.assertEqual(body['repo'], REPO)
+        self.assertTrue(frame.startswith(main.COMMIT_FRAME_HEADER))
+
+    def test_non_commit_frame(self):
+        frame, _ = commit_frame([('create', 'app.bsky.feed.post/1', 0)], [POST], header={'op': 1, 't': '#identity'})
+        self.assertEqual(main.decode_commit(frame), [])
+
+    def test_commit_without_wanted_ops(self):
+        frame, _ = commit_frame([('create', 'app.bsky.feed.like/1', 0), ('delete', 'app.bsky.feed.post/2', None)],
+                                [LIKE])
+        self.assertEqual(main.decode_commit(frame), [])
+
+    def test_post_and_follow_found_past_mst_blocks(self):
+        frame, cids = commit_frame([('create', 'app.bsky.feed.like/1', 0), ('create', 'app.bsky.feed.post/2', 1),
+                                    ('create', 'app.bsky.graph.follow/3', 2)], [LIKE, POST, FOLLOW])
+        records = main.decode_commit(frame)
+        self.assertEqual([(r.repo, r.collection, r.rkey) for r in records],
+                         [(REPO, 'app.bsky.feed.post', '2'), (REPO, 'app.bsky.graph.follow', '3')])
+        self.assertEqual([bytes(r.cid) for r in records], cids[1:])
+        self.assertEqual([libipld.decode_dag_cbor(bytes(r.block)) for r in records], [POST, FOLLOW])
+        self.assertEqual(main.cid_to_str(records[0].cid), libipld.encode_cid(cids[1]))
+
+    def test_collections_filter(self):
+        frame, _ = commit_frame([('create', 'app.bsky.feed.post/2', 0), ('create', 'app.bsky.graph.follow/3', 1)],
+                                [POST, FOLLOW])
+        records = main.decode_commit(frame, collections=('app.bsky.graph.follow',))
+        self.assertEqual([r.collection for r in records], ['app.bsky.graph.follow'])
+
+
+if __name__ == '__main__':
+    unittest.main()
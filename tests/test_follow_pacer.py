@@ -0,0 +1,64 @@
+import random
+import unittest
+from datetime import datetime, timedelta
+
+import main
+
+
+class FollowPacerTest(unittest.TestCase):
+    def setUp(self):
+        random.seed(0)
+        self.pacer = main.FollowPacer(100)
+        self.day = datetime(2026, 3, 2)
+
+    def local(self, hour, minute=0, second=0):
+        return self.pacer.tz.localize(self.day.replace(hour=hour, minute=minute, second=second))
+
+    def run_pacer(self, now, until):
+        # Follows immediately whenever the pacer's delay runs out, like follow_cycle with no candidate shortage
+        follows = []
+        while True:
+            now += timedelta(seconds=self.pacer.next_delay(now))
+            if now >= until:
+                return follows
+            self.pacer.record_follow(now)
+            follows.append(now)
+
+    def test_spreads_budget_over_the_window(self):
+        start, end = self.local(8), self.local(23)
+        follows = self.run_pacer(start, end)
+        self.assertEqual(len(follows), 100)
+        self.assertTrue(all(start <= at < end for at in follows))
+        gaps = [(b - a).total_seconds() for a, b in zip(follows, follows[1:])]
+        self.assertGreaterEqual(min(gaps), main.FOLLOW_DELAY_MIN)
+
+    def test_late_start_does_not_burst(self):
+        start = self.local(22, 58)
+        self.pacer.start_window(self.local(8), 80)
+        follows = self.run_pacer(start, self.local(23))
+        self.assertLessEqual(len(follows), 2)
+        gaps = [(b - a).total_seconds() for a, b in zip(follows, follows[1:])]
+        self.assertTrue(all(gap >= main.FOLLOW_DELAY_MIN for gap in gaps))
+
+    def test_leftover_budget_moves_to_next_window(self):
+        self.pacer.start_window(self.local(8), 80)
+        now = self.local(22, 59, 30)
+        self.pacer.record_follow(now - timedelta(seconds=10))
+        resume = now + timedelta(seconds=self.pacer.next_delay(now))
+        self.assertGreaterEqual(resume, self.local(8) + timedelta(days=1))
+
+    def test_never_follows_closer_than_minimum_after_previous(self):
+        self.pacer.start_window(self.local(8), 0)
+        now = self.local(12)
+        self.pacer.record_follow(now)
+        later = now + timedelta(seconds=30)
+        self.assertGreaterEqual(self.pacer.next_delay(later), main.FOLLOW_DELAY_MIN - 30)
+
+    def test_spent_budget_waits_for_next_window(self):
+        self.pacer.start_window(self.local(8), 100)
+        delay = self.pacer.next_delay(self.local(12))
+        self.assertGreaterEqual(self.local(12) + timedelta(seconds=delay), self.local(8) + timedelta(days=1))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,45 @@
+import os
+import sqlite3
+import tempfile
+import unittest
+from datetime import datetime
+
+import main
+
+
+class FollowStoreTest(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmp.name, 'follows.db')
+        self.store = main.FollowStore(self.path)
+
+    def tearDown(self):
+        self.store.close()
+        self.tmp.cleanup()
+
+    def test_flush_writes_queued_rows(self):
+        self.store.record_follow('did:plc:a', 'a.test', datetime(2026, 3, 2))
+        self.assertEqual(self.store.flush(), 1)
+        self.assertEqual(self.store.pending, 0)
+        self.assertEqual(self.store.query('SELECT did FROM followed_users'), [('did:plc:a',)])
+
+    def test_failed_flush_keeps_rows_queued(self):
+        self.store.record_follow('did:plc:a', 'a.test', datetime(2026, 3, 2))
+        self.store.conn.execute('PRAGMA busy_timeout = 0')
+        other = sqlite3.connect(self.path)
+        other.execute('BEGIN IMMEDIATE')
+        try:
+            with self.assertRaises(sqlite3.OperationalError):
+                self.store.flush()
+            self.assertEqual(self.store.pending, 1)
+            self.store.record_follow('did:plc:b', 'b.test', datetime(2026, 3, 2))
+        finally:
+            other.rollback()
+            other.close()
+
+        self.assertEqual(self.store.flush(), 2)
+        self.assertEqual(sorted(self.store.query('SELECT did FROM followed_users')), [('did:plc:a',), ('did:plc:b',)])
+
+
+if __name__ == '__main__':
+    unittest.main()
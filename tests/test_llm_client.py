@@ -0,0 +1,35 @@
+import asyncio
+import threading
+import time
+import unittest
+
+import main
+
+
+class LLMClientRunTest(unittest.TestCase):
+    def test_calls_in_flight_are_bounded_by_pool_size(self):
+        client = main.LLMClient(base_url='http://127.0.0.1:1', pool_size=3)
+        lock = threading.Lock()
+        state = {'running': 0, 'peak': 0}
+
+        def call():
+            with lock:
+                state['running'] += 1
+                state['peak'] = max(state['peak'], state['running'])
+            time.sleep(0.01)
+            with lock:
+                state['running'] -= 1
+
+        async def many_accounts():
+            # Callers from any number of bots share the client's threads
+            await asyncio.gather(*(client.run(call) for _ in range(20)))
+
+        try:
+            asyncio.run(many_accounts())
+        finally:
+            client.close()
+        self.assertEqual(state['peak'], 3)
+
+
+if __name__ == '__main__':
+    unittest.main()
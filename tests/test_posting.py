@@ -0,0 +1,53 @@
+import asyncio
+import os
+import tempfile
+import unittest
+from types import SimpleNamespace
+from unittest import mock
+
+import main
+
+
+class FakeClient:
+    def __init__(self, fail_at=None):
+        self.me = SimpleNamespace(did='did:plc:me')
+        self.fail_at = fail_at
+        self.posts = []
+
+    def send_post(self, text, facets=None, reply_to=None):
+        if len(self.posts) == self.fail_at:
+            raise RuntimeError('upstream error')
+        self.posts.append(text)
+        return SimpleNamespace(uri=f'at://did:plc:me/app.bsky.feed.post/{len(self.posts)}', cid=f'cid{len(self.posts)}')
+
+
+class ThreadPostingTest(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        with mock.patch.object(main.BlueskyBot, 'login'):
+            self.bot = main.BlueskyBot('me.test', 'secret', db_path=os.path.join(self.tmp.name, 'follows.db'))
+        self.text = ' '.join(f'word{i}' for i in range(120))
+
+    def tearDown(self):
+        self.bot.close()
+        self.tmp.cleanup()
+
+    def test_failure_after_first_part_keeps_the_published_thread(self):
+        self.bot.client = FakeClient(fail_at=1)
+        self.assertEqual(self.bot.post_to_bluesky(self.text), 'at://did:plc:me/app.bsky.feed.post/1')
+
+    def test_failure_on_first_part_raises(self):
+        self.bot.client = FakeClient(fail_at=0)
+        with self.assertRaises(RuntimeError):
+            self.bot.post_to_bluesky(self.text)
+
+    def test_partially_posted_draft_is_not_posted_again(self):
+        self.bot.client = FakeClient(fail_at=1)
+        self.bot.db.add_draft(self.text)
+        self.assertIsNotNone(asyncio.run(self.bot.daily_post()))
+        self.assertIsNone(self.bot.db.next_draft())
+        self.assertEqual(len(self.bot.client.posts), 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
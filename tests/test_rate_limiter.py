@@ -0,0 +1,70 @@
+import unittest
+from datetime import datetime
+
+import main
+
+
+class RateLimiterTest(unittest.TestCase):
+    def setUp(self):
+        self.real_clock = main.clock
+        self.clock = main.clock = main.SimulatedClock(datetime(2026, 1, 1, tzinfo=main.utc))
+        self.limiter = main.RateLimiter(default_limit=10, default_window=10)
+
+    def tearDown(self):
+        main.clock = self.real_clock
+
+    def headers(self, limit, remaining, policy=None, reset_in=None):
+        headers = {'ratelimit-limit': str(limit), 'ratelimit-remaining': str(remaining)}
+        if policy:
+            headers['ratelimit-policy'] = policy
+        if reset_in is not None:
+            headers['ratelimit-reset'] = str(int(self.clock.time() + reset_in))
+        return headers
+
+    def test_default_bucket_refills_continuously(self):
+        for _ in range(10):
+            self.limiter.acquire('getProfile')
+        self.assertEqual(self.clock.monotonic(), 0)
+        self.limiter.acquire('getProfile')
+        self.assertAlmostEqual(self.clock.monotonic(), 1.0)
+
+    def test_window_parsed_from_policy(self):
+        self.limiter.update('createRecord', self.headers(100, 100, policy='100;w=60'))
+        bucket = self.limiter.buckets['createRecord']
+        self.assertEqual(bucket.capacity, 100)
+        self.assertAlmostEqual(bucket.rate, 100 / 60)
+
+    def test_missing_or_malformed_headers_are_ignored(self):
+        self.limiter.update('createRecord', {'ratelimit-limit': 'lots', 'ratelimit-remaining': '1'})
+        self.limiter.update('createRecord', {})
+        self.assertNotIn('createRecord', self.limiter.buckets)
+        self.limiter.update('createRecord', self.headers(100, 100, policy='100;w=abc'))
+        self.assertAlmostEqual(self.limiter.buckets['createRecord'].rate, 100 / 10)
+
+    def test_exhausted_bucket_waits_for_reset(self):
+        self.limiter.update('createRecord', self.headers(100, 0, policy='100;w=300', reset_in=30))
+        self.limiter.acquire('createRecord')
+        # Reset is padded by a second so the call never lands just before it
+        self.assertAlmostEqual(self.clock.monotonic(), 31)
+
+    def test_full_refill_after_reset(self):
+        self.limiter.update('createRecord', self.headers(5, 0, policy='5;w=300', reset_in=30))
+        self.clock.advance(31)
+        for _ in range(5):
+            self.limiter.acquire('createRecord')
+        self.assertEqual(self.clock.monotonic(), 31)
+        # Past the reset the bucket refills at the policy rate again
+        self.limiter.acquire('createRecord')
+        self.assertAlmostEqual(self.clock.monotonic(), 31 + 300 / 5)
+
+    def test_server_count_wins_over_local_tokens(self):
+        self.limiter.update('createRecord', self.headers(10, 2, policy='10;w=10'))
+        self.limiter.acquire('createRecord')
+        self.limiter.acquire('createRecord')
+        self.assertEqual(self.clock.monotonic(), 0)
+        self.limiter.acquire('createRecord')
+        self.assertAlmostEqual(self.clock.monotonic(), 1.0)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,50 @@
+import asyncio
+import socket
+import threading
+import time
+import unittest
+
+import main
+
+
+class SimulatedClockTest(unittest.TestCase):
+    def test_sleep_jumps_virtual_time(self):
+        clock = main.SimulatedClock()
+
+        async def sleeper():
+            await asyncio.sleep(86400)
+            return clock.monotonic()
+
+        start = time.perf_counter()
+        self.assertGreaterEqual(clock.run(sleeper()), 86400)
+        self.assertLess(time.perf_counter() - start, 5)
+
+    def test_waiting_only_on_io_blocks_instead_of_spinning(self):
+        clock = main.SimulatedClock()
+        reader, writer = socket.socketpair()
+        threading.Timer(0.2, writer.send, (b'x',)).start()
+        selects = []
+
+        async def read():
+            loop = asyncio.get_running_loop()
+            select = loop._selector.select
+
+            def counting_select(timeout=None):
+                selects.append(timeout)
+                return select(timeout)
+
+            loop._selector.select = counting_select
+            reader.setblocking(False)
+            return await loop.sock_recv(reader, 1)
+
+        try:
+            self.assertEqual(clock.run(read()), b'x')
+        finally:
+            reader.close()
+            writer.close()
+        self.assertLess(len(selects), 10)
+        self.assertEqual(clock.monotonic(), 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
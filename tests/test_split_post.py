@@ -0,0 +1,92 @@
+import unittest
+
+import main
+
+FAMILY = '\U0001F468‍\U0001F469‍\U0001F467'
+FLAG_IN = '\U0001F1EE\U0001F1F3'
+
+
+class ScanTextTest(unittest.TestCase):
+    def test_clusters(self):
+        self.assertEqual(main.count_graphemes(FAMILY), 1)
+        self.assertEqual(main.count_graphemes(FLAG_IN * 2), 2)
+        self.assertEqual(main.count_graphemes('é'), 1)
+        self.assertEqual(main.count_graphemes('\U0001F44D\U0001F3FD'), 1)
+        self.assertEqual(main.count_graphemes('नमस्ते'), 4)
+        self.assertEqual(main.count_graphemes('a\r\nb'), 3)
+
+    def test_byte_offsets_follow_utf8(self):
+        text = 'aé€\U0001F44D'
+        _, byte_at = main.scan_text(text)
+        self.assertEqual(byte_at, [0, 1, 3, 6, 10])
+
+
+class DetectFacetsTest(unittest.TestCase):
+    def test_kinds_and_trailing_punctuation(self):
+        text = 'See https://example.com/a_(b). Ask @Alice.bsky.social about #python!'
+        spans = main.detect_facets(text)
+        self.assertEqual([(kind, value) for _, _, kind, value in spans], [
+            ('link', 'https://example.com/a_(b)'),
+            ('mention', 'alice.bsky.social'),
+            ('tag', 'python'),
+        ])
+        self.assertEqual([text[start:end] for start, end, _, _ in spans],
+                         ['https://example.com/a_(b)', '@Alice.bsky.social', '#python'])
+
+    def test_ignores_emails_and_numeric_tags(self):
+        self.assertEqual(main.detect_facets('mail me@example.com about #2024'), [])
+
+
+class SplitPostTest(unittest.TestCase):
+    def assertValidChunks(self, text, chunks):
+        for chunk, facets in chunks:
+            self.assertLessEqual(main.count_graphemes(chunk), main.POST_MAX_GRAPHEMES)
+            self.assertTrue(chunk)
+            encoded = chunk.encode('utf-8')
+            for byte_start, byte_end, kind, value in facets:
+                covered = encoded[byte_start:byte_end].decode('utf-8')
+                expected = {'link': value, 'mention': '@' + value, 'tag': '#' + value}[kind]
+                self.assertEqual(covered.lower(), expected.lower())
+        # Nothing but the whitespace at the breaks is lost
+        self.assertEqual(''.join(''.join(chunk.split()) for chunk, _ in chunks), ''.join(text.split()))
+
+    def test_short_text_is_one_chunk(self):
+        chunks = main.split_post('  hello #world  ')
+        self.assertEqual(chunks, [('hello #world', [(6, 12, 'tag', 'world')])])
+
+    def test_splits_at_whitespace_and_keeps_facets_whole(self):
+        words = ' '.join(f'word{i}' for i in range(50))
+        text = f'{words} https://example.com/some/long/path @someone.bsky.social {words} #tagged {words}'
+        chunks = main.split_post(text)
+        self.assertGreater(len(chunks), 1)
+        self.assertValidChunks(text, chunks)
+        kinds = [kind for _, facets in chunks for _, _, kind, _ in facets]
+        self.assertEqual(sorted(kinds), ['link', 'mention', 'tag'])
+
+    def test_facet_offsets_after_multibyte_text(self):
+        text = ('é\U0001F44D ' * 120) + '@someone.bsky.social € #café ' + ('नम ' * 100)
+        chunks = main.split_post(text)
+        self.assertValidChunks(text, chunks)
+        self.assertEqual(sum(len(facets) for _, facets in chunks), 2)
+
+    def test_text_without_whitespace_is_hard_cut(self):
+        text = 'a' * 700
+        chunks = main.split_post(text)
+        self.assertEqual([len(chunk) for chunk, _ in chunks], [300, 300, 100])
+        self.assertValidChunks(text, chunks)
+
+    def test_emoji_only_text_never_splits_a_cluster(self):
+        for text in (FAMILY * 350, '\U0001F44D' * 650, FLAG_IN * 301):
+            chunks = main.split_post(text)
+            self.assertGreater(len(chunks), 1)
+            self.assertValidChunks(text, chunks)
+            self.assertEqual(''.join(chunk for chunk, _ in chunks), text)
+            for chunk, _ in chunks:
+                self.assertFalse(chunk.startswith('‍'))
+                self.assertEqual(main.count_graphemes(chunk), len(main.scan_text(chunk)[0]))
+            if text.startswith(FLAG_IN):
+                self.assertTrue(all(len(chunk) % 2 == 0 for chunk, _ in chunks))
+
+
+if __name__ == '__main__':
+    unittest.main()
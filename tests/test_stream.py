@@ -0,0 +1,43 @@
+import asyncio
+import json
+import unittest
+
+import main
+
+
+def post_line(did, rkey, text):
+    return json.dumps({'did': did, 'time_us': 1, 'kind': 'commit', 'commit': {
+        'operation': 'create', 'collection': 'app.bsky.feed.post', 'rkey': rkey, 'cid': 'bafy',
+        'record': {'text': text}}}).encode()
+
+
+class StreamFanOutTest(unittest.TestCase):
+    def test_full_queue_drops_for_that_account_only(self):
+        async def run():
+            consumer = main.JetstreamConsumer()
+            stuck = consumer.subscribe('did:plc:stuck', 'stuck.test', ['python'])
+            live = consumer.subscribe('did:plc:live', 'live.test', ['python'])
+            stuck.queue = asyncio.Queue(maxsize=2)
+            for index in range(5):
+                # Nothing reads the stuck queue; this would hang if the consumer waited on it
+                await asyncio.wait_for(consumer.handle_line(post_line('did:plc:author', str(index), 'I like python')), 1)
+            return stuck, live
+
+        stuck, live = asyncio.run(run())
+        self.assertEqual(stuck.queue.qsize(), 2)
+        self.assertEqual(stuck.dropped, 3)
+        self.assertEqual(live.queue.qsize(), 5)
+        self.assertEqual(live.dropped, 0)
+
+    def test_classifies_mentions_and_candidates(self):
+        subscription = main.StreamSubscription('did:plc:me', 'me.test', ['python'])
+        self.assertEqual(subscription.classify('did:plc:a', 'hi @me.test', {}), 'mention')
+        facets = [{'features': [{'did': 'did:plc:me'}]}]
+        self.assertEqual(subscription.classify('did:plc:a', 'hi', {'facets': facets}), 'mention')
+        self.assertEqual(subscription.classify('did:plc:a', 'Python!', {}), 'candidate')
+        self.assertIsNone(subscription.classify('did:plc:me', 'python by me', {}))
+        self.assertIsNone(subscription.classify('did:plc:a', 'nothing here', {}))
+
+
+if __name__ == '__main__':
+    unittest.main()
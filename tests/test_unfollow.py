@@ -0,0 +1,78 @@
+import os
+import tempfile
+import unittest
+from datetime import datetime, timedelta
+from types import SimpleNamespace
+
+from atproto import exceptions
+
+import main
+
+
+class FakeClient:
+    def __init__(self, missing_profiles=(), bad_records=()):
+        self.me = SimpleNamespace(did='did:plc:me')
+        self.missing_profiles = set(missing_profiles)
+        self.bad_records = set(bad_records)
+        self.deleted = []
+        self.com = SimpleNamespace(atproto=SimpleNamespace(repo=SimpleNamespace(apply_writes=self.apply_writes)))
+
+    def get_profile(self, did):
+        if did in self.missing_profiles:
+            raise exceptions.BadRequestError()
+        return SimpleNamespace(viewer=SimpleNamespace(following=f'at://did:plc:me/app.bsky.graph.follow/{did[-1]}'))
+
+    def apply_writes(self, data):
+        if any(write.rkey in self.bad_records for write in data.writes):
+            raise exceptions.BadRequestError()
+        self.deleted.extend(write.rkey for write in data.writes)
+
+    def delete_follow(self, follow_uri):
+        rkey = follow_uri.rsplit('/', 1)[-1]
+        if rkey in self.bad_records:
+            raise exceptions.BadRequestError()
+        self.deleted.append(rkey)
+        return True
+
+
+class UnfollowSweepTest(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.bot = main.BlueskyBot.__new__(main.BlueskyBot)
+        self.bot.handle = 'me.test'
+        self.bot.db = main.FollowStore(os.path.join(self.tmp.name, 'follows.db'))
+        followed_at = datetime.now() - timedelta(days=main.UNFOLLOW_AFTER_DAYS + 1)
+        for name in 'abcd':
+            # Row c predates stored follow URIs and needs a profile lookup
+            follow_uri = None if name == 'c' else f'at://did:plc:me/app.bsky.graph.follow/{name}'
+            self.bot.db.record_follow(f'did:plc:{name}', f'{name}.test', followed_at, follow_uri)
+
+    def tearDown(self):
+        self.bot.db.close()
+        self.tmp.cleanup()
+
+    def active(self):
+        self.bot.db.flush()
+        return sorted(row[0] for row in self.bot.db.query('SELECT did FROM followed_users WHERE unfollowed = 0'))
+
+    def test_deletes_page_in_one_batch(self):
+        self.bot.client = FakeClient()
+        self.assertEqual(self.bot.check_unfollows(), 4)
+        self.assertEqual(sorted(self.bot.client.deleted), ['a', 'b', 'c', 'd'])
+        self.assertEqual(self.active(), [])
+
+    def test_failed_profile_lookup_does_not_block_the_page(self):
+        self.bot.client = FakeClient(missing_profiles={'did:plc:c'})
+        self.assertEqual(self.bot.check_unfollows(), 3)
+        self.assertEqual(self.active(), [])
+
+    def test_bad_record_falls_back_to_single_deletes(self):
+        self.bot.client = FakeClient(bad_records={'b'})
+        self.assertEqual(self.bot.check_unfollows(), 3)
+        self.assertEqual(sorted(self.bot.client.deleted), ['a', 'c', 'd'])
+        # The failed delete stays due and is retried on the next sweep
+        self.assertEqual(self.active(), ['did:plc:b'])
+
+
+if __name__ == '__main__':
+    unittest.main()